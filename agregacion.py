@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from cache import cache_datos
+
+HORAS = 24
+horas_labels = [f"{str(h).zfill(2)}:00 - {str(h).zfill(2)}:59" for h in range(HORAS)]
+INTERVALOS_HORA = pd.CategoricalDtype(horas_labels, ordered=True)
+
+
+def etiquetar_horas(horas):
+    """Etiquetas "HH:00 - HH:59" de un arreglo de horas 0-23, tomadas de la tabla precalculada."""
+    return pd.Categorical.from_codes(np.asarray(horas, dtype=np.int8), dtype=INTERVALOS_HORA)
+
+
+class CorteCubo:
+    """Conteos de un día: ejes empresa × destino × hora."""
+
+    def __init__(self, conteos, empresas, destinos):
+        self.conteos = conteos
+        # Los cortes también se comparten entre sesiones
+        self.conteos.flags.writeable = False
+        self.empresas = list(empresas)
+        self.destinos = list(destinos)
+
+    def empresas_presentes(self):
+        return [e for e, n in zip(self.empresas, self.conteos.sum(axis=(1, 2))) if n > 0]
+
+    def destinos_presentes(self):
+        return [d for d, n in zip(self.destinos, self.conteos.sum(axis=(0, 2))) if n > 0]
+
+    def horas_presentes(self):
+        return np.flatnonzero(self.conteos.sum(axis=(0, 1))).tolist()
+
+    def filtrar(self, destinos, empresas):
+        # Se conserva el orden del cubo: el resultado no depende del orden de la selección
+        idx_emp = sorted({self.empresas.index(e) for e in empresas if e in self.empresas})
+        idx_dest = sorted({self.destinos.index(d) for d in destinos if d in self.destinos})
+        conteos = self.conteos[np.ix_(idx_emp, idx_dest, np.arange(HORAS))]
+        return CorteCubo(conteos, [self.empresas[i] for i in idx_emp], [self.destinos[i] for i in idx_dest])
+
+    def filtrar_horas(self, desde, hasta):
+        conteos = np.zeros_like(self.conteos)
+        conteos[:, :, desde:hasta + 1] = self.conteos[:, :, desde:hasta + 1]
+        return CorteCubo(conteos, self.empresas, self.destinos)
+
+    def _matriz_empresa(self, empresa):
+        """Matriz destino × hora de la empresa, solo con los destinos que tienen despachos."""
+        if empresa not in self.empresas:
+            return np.zeros((0, HORAS), dtype=self.conteos.dtype), []
+        matriz = self.conteos[self.empresas.index(empresa)]
+        presentes = np.flatnonzero(matriz.sum(axis=1))
+        return matriz[presentes], [self.destinos[i] for i in presentes]
+
+    def resumen(self, empresa):
+        """Cantidad de equipos por hora y destino (formato largo, para el gráfico)."""
+        matriz, destinos = self._matriz_empresa(empresa)
+        idx_dest, horas = np.nonzero(matriz)
+        orden = np.lexsort((idx_dest, horas))
+        return pd.DataFrame({
+            'hora': horas[orden],
+            'destino': np.array(destinos, dtype=object)[idx_dest[orden]] if destinos else [],
+            'Cantidad': matriz[idx_dest[orden], horas[orden]]
+        })
+
+    def tabla(self, empresa):
+        """Tabla hora × destino con la fila TOTAL."""
+        matriz, destinos = self._matriz_empresa(empresa)
+        tabla = pd.DataFrame(matriz.T, index=etiquetar_horas(np.arange(HORAS)), columns=pd.Index(destinos, name='destino'))
+        sumatoria = pd.DataFrame(tabla.sum(axis=0)).T
+        sumatoria.index = ['TOTAL']
+        return pd.concat([tabla, sumatoria])
+
+
+class CuboDespachos:
+    """Conteos de despachos precalculados: ejes fecha × empresa × destino × hora."""
+
+    def __init__(self, conteos, fechas, empresas, destinos):
+        self.conteos = conteos
+        # Compartido entre sesiones: de solo lectura
+        self.conteos.flags.writeable = False
+        self.fechas = list(fechas)
+        self.empresas = list(empresas)
+        self.destinos = list(destinos)
+        self._indice_fechas = {f: i for i, f in enumerate(self.fechas)}
+
+    @classmethod
+    def desde_dataframe(cls, df):
+        df = df.dropna(subset=['fecha', 'hora'])
+        dias = df['fecha'].to_numpy().astype('datetime64[D]')
+        fechas, cod_fecha = np.unique(dias, return_inverse=True)
+        cod_emp, empresas = pd.factorize(df['empresa'], sort=True)
+        cod_dest, destinos = pd.factorize(df['destino'], sort=True)
+        horas = df['hora'].to_numpy(dtype=np.int64)
+
+        forma = (len(fechas), len(empresas), len(destinos), HORAS)
+        plano = np.ravel_multi_index((cod_fecha.ravel(), cod_emp, cod_dest, horas), forma) if len(df) else []
+        conteos = np.bincount(plano, minlength=int(np.prod(forma))).astype(np.int32).reshape(forma)
+        return cls(conteos, fechas.astype(object), empresas, destinos)
+
+    def _sub_cubo(self, desde, hasta, empresas=None, destinos=None):
+        idx_fechas = [i for i, f in enumerate(self.fechas) if desde <= f <= hasta]
+        idx_emp = [i for i, e in enumerate(self.empresas) if empresas is None or e in empresas]
+        idx_dest = [i for i, d in enumerate(self.destinos) if destinos is None or d in destinos]
+        conteos = self.conteos[np.ix_(idx_fechas, idx_emp, idx_dest, np.arange(HORAS))]
+        return conteos, [self.fechas[i] for i in idx_fechas], [self.empresas[i] for i in idx_emp]
+
+    def matriz_dia_hora(self, desde, hasta, empresas=None, destinos=None):
+        """Equipos por día y hora en el rango: (fechas, matriz fechas × 24)."""
+        conteos, fechas, _ = self._sub_cubo(desde, hasta, empresas, destinos)
+        return fechas, conteos.sum(axis=(1, 2))
+
+    def totales_diarios(self, desde, hasta, empresas=None, destinos=None):
+        """Total de equipos por día (filas) y empresa (columnas) en el rango."""
+        conteos, fechas, empresas = self._sub_cubo(desde, hasta, empresas, destinos)
+        return pd.DataFrame(
+            conteos.sum(axis=(2, 3)),
+            index=pd.Index(fechas, name='fecha'),
+            columns=pd.Index(empresas, name='empresa')
+        )
+
+    def corte(self, fecha):
+        i = self._indice_fechas.get(fecha)
+        if i is None:
+            return CorteCubo(np.zeros((0, 0, HORAS), dtype=np.int32), [], [])
+        return CorteCubo(self.conteos[i], self.empresas, self.destinos)
+
+
+def obtener_cubo(clave, df):
+    """Cubo del dataset identificado por `clave`; se construye una sola vez y se comparte entre sesiones.
+
+    `df` puede ser una función que entrega el DataFrame, para no obtenerlo si el cubo ya existe.
+    """
+    return cache_datos.obtener(
+        ('cubo', clave),
+        lambda: CuboDespachos.desde_dataframe(df() if callable(df) else df),
+        lambda cubo: cubo.conteos.nbytes
+    )
@@ -0,0 +1,131 @@
+import os
+import sqlite3
+from datetime import datetime
+from functools import lru_cache
+from itertools import repeat
+from pathlib import Path
+
+import pandas as pd
+
+from ingesta import compactar
+
+RUTA_ALMACEN = os.environ.get("INFORME_ALMACEN", str(Path(__file__).parent / "despachos.sqlite"))
+
+# Se incrementa cuando cambia el esquema. Un histórico con otra versión no se abre: es la
+# única copia de días que quizá ya no se puedan volver a cargar, así que nunca se borra
+VERSION_ESQUEMA = 2
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS archivos (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    ingresado TEXT NOT NULL,
+    filas INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS despachos (
+    fecha TEXT NOT NULL,
+    hora INTEGER NOT NULL,
+    minuto INTEGER NOT NULL,
+    empresa TEXT NOT NULL,
+    destino TEXT NOT NULL,
+    ocurrencia INTEGER NOT NULL,
+    archivo INTEGER NOT NULL,
+    PRIMARY KEY (fecha, hora, minuto, empresa, destino, ocurrencia)
+) WITHOUT ROWID;
+"""
+
+
+class EsquemaIncompatible(RuntimeError):
+    """El histórico fue creado con otra versión del esquema."""
+
+
+class AlmacenDespachos:
+    """Histórico local de despachos en SQLite, agrupado físicamente por fecha.
+
+    Cada despacho se identifica por su contenido: (fecha, hora, minuto, empresa, destino,
+    ocurrencia), donde ocurrencia numera las filas idénticas dentro de un archivo. Un
+    libro reexportado, o uno semanal que repite días ya cargados, solo agrega los
+    despachos nuevos; dos despachos distintos de la misma hora se guardan ambos. `archivo`
+    es el id entero del libro que aportó la fila.
+    """
+
+    def __init__(self, ruta=RUTA_ALMACEN):
+        self.ruta = ruta
+        self._ingresados = set()
+        with self._conectar() as con:
+            existe = con.execute("SELECT 1 FROM sqlite_master WHERE name = 'despachos'").fetchone()
+            version = con.execute("PRAGMA user_version").fetchone()[0]
+            if not existe:
+                con.executescript(_ESQUEMA)
+                con.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+            elif version != VERSION_ESQUEMA:
+                raise EsquemaIncompatible(
+                    f"El histórico {ruta} tiene el esquema v{version} y esta versión usa el v{VERSION_ESQUEMA}. "
+                    "No se modificó: respáldelo y muévalo, o use otra ruta con INFORME_ALMACEN."
+                )
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def ingresar(self, clave, df):
+        """Agrega las filas del archivo `clave`; devuelve cuántas filas nuevas se guardaron.
+
+        `df` puede ser una función que devuelve el DataFrame: solo se llama si el archivo
+        no se ingresó antes en este proceso.
+        """
+        if clave in self._ingresados:
+            return 0
+        df = (df() if callable(df) else df).dropna(subset=['fecha'])
+        llave = ['fecha', 'hora', 'minuto', 'empresa', 'destino']
+        ocurrencia = df.groupby(llave, observed=True, sort=False).cumcount()
+        try:
+            with self._conectar() as con:
+                # Registrar primero el archivo: si otra sesión lo ingresa a la vez, el hash
+                # único falla y la transacción completa se revierte
+                archivo = con.execute(
+                    "INSERT INTO archivos (hash, ingresado, filas) VALUES (?, ?, ?)",
+                    (clave, datetime.now().isoformat(timespec='seconds'), len(df))
+                ).lastrowid
+                filas = zip(
+                    df['fecha'].dt.strftime('%Y-%m-%d'),
+                    df['hora'].astype(int),
+                    df['minuto'].astype(int),
+                    df['empresa'].astype(str),
+                    df['destino'].astype(str),
+                    ocurrencia.astype(int),
+                    repeat(archivo)
+                )
+                antes = con.total_changes
+                con.executemany("INSERT OR IGNORE INTO despachos VALUES (?, ?, ?, ?, ?, ?, ?)", filas)
+                nuevas = con.total_changes - antes
+        except sqlite3.IntegrityError:
+            nuevas = 0
+        self._ingresados.add(clave)
+        return nuevas
+
+    def version(self):
+        """Cambia cada vez que se ingresa un archivo; sirve de clave para memorizar consultas."""
+        with self._conectar() as con:
+            return con.execute("SELECT COUNT(*), MAX(ingresado) FROM archivos").fetchone()
+
+    def fechas(self):
+        with self._conectar() as con:
+            filas = con.execute("SELECT DISTINCT fecha FROM despachos ORDER BY fecha").fetchall()
+        return [datetime.strptime(f, '%Y-%m-%d').date() for (f,) in filas]
+
+    def consultar(self, desde, hasta=None):
+        """Despachos entre `desde` y `hasta` (inclusive) con el mismo esquema que la ingesta."""
+        hasta = hasta or desde
+        with self._conectar() as con:
+            df = pd.read_sql_query(
+                "SELECT fecha, destino, empresa, hora, minuto FROM despachos WHERE fecha BETWEEN ? AND ?",
+                con,
+                params=(str(desde), str(hasta))
+            )
+        df['fecha'] = pd.to_datetime(df['fecha'], format='%Y-%m-%d')
+        return compactar(df)
+
+
+@lru_cache(maxsize=None)
+def obtener_almacen(ruta=RUTA_ALMACEN):
+    return AlmacenDespachos(ruta)
@@ -1,64 +1,169 @@
+from functools import partial
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.io as pio
-from PIL import Image
-from fpdf import FPDF
-import tempfile
-import os
-from pathlib import Path
+
+from agregacion import obtener_cubo
+from almacen import EsquemaIncompatible, obtener_almacen
+from cache import cache_datos, cache_vistas
+from diagnostico import Diagnostico, iniciar_perfil, resumir_etapas, terminar_perfil
+from ingesta import (
+    FormatoInvalido, cargar_excels, clave_conjunto, hash_contenido, identificar_libros, tamano_dataframe
+)
+from recursos import obtener_recursos
+from reportes import (
+    ANCHO_GRAFICO, ESCALA_GRAFICO, estadisticas_cache_graficos, generar_pdf_empresa, generar_zip_reportes,
+    grafico_calor_horas, grafico_empresa, grafico_totales_diarios, nombre_archivo, rasterizar_grafico
+)
+from tabla_excel import generar_excel_empresas
+from trabajos import EN_COLA, ERROR, LISTO, cola_reportes
 
 # Configuración global
 pio.templates.default = "plotly"
-COLOR_PALETTE = px.colors.qualitative.Plotly
-
-# Función robusta para normalizar nombres de empresa
-def normalizar_nombre_empresa(nombre):
-    nombre = str(nombre).strip().upper()
-    nombre = nombre.replace('.', '').replace('&', 'AND')
-    nombre = ' '.join(nombre.split())  # Normaliza espacios múltiples
-    equivalencias = {
-        # JORQUERA TRANSPORTE S. A.
-        "JORQUERA TRANSPORTE S A": "JORQUERA TRANSPORTE S. A.",
-        # M S & D SPA y variantes
-        "MINING SERVICES AND DERIVATES": "M S & D SPA",
-        "MINING SERVICES AND DERIVATES SPA": "M S & D SPA",
-        "M S AND D": "M S & D SPA",
-        "M S AND D SPA": "M S & D SPA",
-        "MSANDD SPA": "M S & D SPA",
-        "M S D": "M S & D SPA",
-        "M S D SPA": "M S & D SPA",
-        "M S & D": "M S & D SPA",
-        "M S & D SPA": "M S & D SPA",
-        "MS&D SPA": "M S & D SPA",
-        # M&Q SPA y variantes
-        "M AND Q SPA": "M&Q SPA",
-        "M AND Q": "M&Q SPA",
-        "M Q SPA": "M&Q SPA",
-        "MQ SPA": "M&Q SPA",
-        "M&Q SPA": "M&Q SPA",
-        "MANDQ SPA": "M&Q SPA",
-        "MINING AND QUARRYING SPA": "M&Q SPA",
-        "MINING AND QUARRYNG SPA": "M&Q SPA",
-        # AG SERVICES SPA
-        "AG SERVICE SPA": "AG SERVICES SPA",
-        "AG SERVICES SPA": "AG SERVICES SPA",
-        # COSEDUCAM S A
-        "COSEDUCAM S A": "COSEDUCAM S A"
-    }
-    return equivalencias.get(nombre, nombre)
+
+MAX_REPORTES_SESION = 10
 
 # Configuración de la página
 st.set_page_config(page_title="Dashboard Equipos por Hora", layout="wide")
-CURRENT_DIR = Path(__file__).parent
-LOGOS = {
-    "COSEDUCAM S A": str(CURRENT_DIR / "coseducam.png"),
-    "M&Q SPA": str(CURRENT_DIR / "mq.png"),
-    "M S & D SPA": str(CURRENT_DIR / "msd.png"),
-    "JORQUERA TRANSPORTE S. A.": str(CURRENT_DIR / "jorquera.png"),
-    "AG SERVICES SPA": str(CURRENT_DIR / "ag.png")
-}
-BANNER_PATH = str(CURRENT_DIR / "image.png")
+recursos = obtener_recursos(ANCHO_GRAFICO * ESCALA_GRAFICO)
+
+
+def encolar_reporte(clave, nombre, archivo, mime, funcion):
+    """Encola el reporte en segundo plano y lo anota en la lista de la sesión.
+
+    `funcion(diag_reporte, avance)` mide sus etapas en un Diagnostico propio: el trabajo
+    termina después de esta ejecución, así que el panel las muestra aparte.
+    """
+    diag_reporte = Diagnostico()
+    trabajo = cola_reportes.encolar(clave, nombre, archivo, mime, partial(funcion, diag_reporte))
+    claves = st.session_state.setdefault('reportes_sesion', [])
+    if clave in claves:
+        claves.remove(clave)
+    claves.insert(0, clave)
+    del claves[MAX_REPORTES_SESION:]
+    diagnosticos = st.session_state.setdefault('diag_reportes', {})
+    diagnosticos.setdefault(trabajo.id, diag_reporte)
+    vigentes = {t.id for t in map(cola_reportes.obtener, claves) if t}
+    for id_trabajo in [i for i in diagnosticos if i not in vigentes]:
+        del diagnosticos[id_trabajo]
+
+
+def _panel_reportes():
+    trabajos = [t for t in map(cola_reportes.obtener, st.session_state.get('reportes_sesion', [])) if t]
+    for trabajo in trabajos:
+        if trabajo.estado == LISTO:
+            st.download_button(
+                f"⬇️ {trabajo.nombre} ({trabajo.segundos:.1f} s)",
+                data=trabajo.resultado,
+                file_name=trabajo.archivo,
+                mime=trabajo.mime,
+                key=f"descarga_{trabajo.id}"
+            )
+        elif trabajo.estado == ERROR:
+            st.error(f"{trabajo.nombre}: {trabajo.error}")
+        else:
+            texto = "En cola" if trabajo.estado == EN_COLA else f"Generando... {trabajo.avance:.0%}"
+            st.progress(trabajo.avance, text=f"{trabajo.nombre} · {texto}")
+    # Terminado lo pendiente, una ejecución completa deja de refrescar el panel
+    if st.session_state.get('_panel_refrescando') and all(t.terminado for t in trabajos):
+        st.session_state._panel_refrescando = False
+        st.rerun()
+
+
+def _pdf_empresa(empresa, resumen, tabla_final, diag_reporte, avance):
+    png_grafico = None
+    if not resumen.empty:
+        with diag_reporte.etapa("rasterizar_grafico", filas=len(resumen)) as registro:
+            png_grafico = rasterizar_grafico(resumen, empresa)
+            registro['bytes'] = len(png_grafico)
+        avance(0.6)
+    with diag_reporte.etapa("pdf_empresa") as registro:
+        pdf_bytes = generar_pdf_empresa(empresa, resumen, tabla_final, png_grafico)
+        registro['bytes'] = len(pdf_bytes)
+    return pdf_bytes
+
+
+def normalizar_seleccion(valores):
+    """Selección como tupla ordenada: el orden en que se eligieron no cambia el resultado."""
+    return tuple(sorted(valores))
+
+
+def _vista_tendencia(cubo, desde, hasta, empresas, destinos):
+    fechas, matriz = cubo.matriz_dia_hora(desde, hasta, empresas, destinos)
+    if len(fechas) == 0:
+        return ()
+    totales = cubo.totales_diarios(desde, hasta, empresas, destinos)
+    return grafico_calor_horas(fechas, matriz), grafico_totales_diarios(totales)
+
+
+def _vista_empresa(corte, empresa):
+    resumen = corte.resumen(empresa)
+    tabla_final = corte.tabla(empresa)
+    fig = grafico_empresa(resumen, empresa) if not resumen.empty else None
+    return resumen, tabla_final, fig
+
+
+def libros_subidos(archivos):
+    """{(nombre, clave): bytes} de los archivos subidos.
+
+    El hash de cada archivo se calcula una vez por subida (file_id) y se guarda en la
+    sesión: mover un filtro no vuelve a recorrer los bytes.
+    """
+    anteriores = st.session_state.get('hash_subidos', {})
+    hashes = {f.file_id: anteriores.get(f.file_id) or hash_contenido(f.getvalue()) for f in archivos}
+    st.session_state.hash_subidos = hashes
+    return identificar_libros((f.name, hashes[f.file_id], f.getvalue()) for f in archivos)
+
+
+def filas_de_archivo(df, nombre):
+    return df[df['archivo'] == nombre]
+
+
+def consultar_almacen(almacen, desde, hasta=None):
+    with diag.etapa("almacen_consulta") as registro:
+        df = almacen.consultar(desde, hasta)
+        registro['filas'] = len(df)
+    return df
+
+
+def _zip_empresas(corte, empresas, diag_reporte, avance):
+    with diag_reporte.etapa("pdf_zip", filas=len(empresas)) as registro:
+        zip_bytes = generar_zip_reportes({e: (corte.resumen(e), corte.tabla(e)) for e in empresas}, avance=avance)
+        registro['bytes'] = len(zip_bytes)
+    return zip_bytes
+
+
+def _excel_empresas(corte, empresas, titulo, diag_reporte, avance):
+    with diag_reporte.etapa("excel_empresas", filas=len(empresas)) as registro:
+        excel_bytes = generar_excel_empresas({e: corte.tabla(e) for e in empresas}, titulo, avance=avance)
+        registro['bytes'] = len(excel_bytes)
+    return excel_bytes
+
+
+def mostrar_reportes():
+    """Estado y descargas de los reportes de la sesión; se refresca solo mientras hay pendientes."""
+    trabajos = [t for t in map(cola_reportes.obtener, st.session_state.get('reportes_sesion', [])) if t]
+    if not trabajos:
+        return
+    st.subheader("📥 Reportes")
+    pendientes = not all(t.terminado for t in trabajos)
+    st.session_state._panel_refrescando = pendientes
+    st.fragment(_panel_reportes, run_every=1.0 if pendientes else None)()
+
+
+# --- Diagnóstico de rendimiento ---
+diag = Diagnostico()
+# Un perfil que quedó activo (por un st.stop o st.rerun) no debe seguir corriendo
+perfil_anterior = st.session_state.pop('_perfil_activo', None)
+if perfil_anterior is not None:
+    perfil_anterior.disable()
+with st.sidebar:
+    mostrar_diagnostico = st.checkbox("🩺 Mostrar diagnóstico")
+    perfil = None
+    if mostrar_diagnostico and st.button("Perfilar esta ejecución (cProfile)"):
+        perfil = iniciar_perfil()
+        st.session_state._perfil_activo = perfil
 
 # --- Configuración inicial ---
 if 'step' not in st.session_state:
@@ -350,218 +455,206 @@ elif st.session_state.step == 4:
 
 # Paso 5: Carga Excel y visualización avanzada
 st.markdown("---")
-st.subheader("📂 Cargar Archivo Excel (.xlsx o .xlsm)")
-uploaded_file = st.file_uploader("Carga tu archivo Excel", type=["xlsx", "xlsm"])
-
-if uploaded_file:
+st.subheader("📂 Cargar Archivos Excel (.xlsx o .xlsm)")
+uploaded_files = st.file_uploader(
+    "Carga uno o más archivos Excel (se leen todas sus hojas)", type=["xlsx", "xlsm"], accept_multiple_files=True
+)
+try:
+    almacen = obtener_almacen()
+except EsquemaIncompatible as e:
+    # El histórico no se toca: la app sigue funcionando solo con los archivos cargados
+    almacen = None
+    st.warning(str(e))
+fuentes = ["Archivo cargado"] + (["Histórico almacenado"] if almacen is not None else [])
+fuente = st.radio("Origen de los datos:", fuentes, horizontal=True)
+
+if uploaded_files or fuente == "Histórico almacenado":
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp:
-            tmp.write(uploaded_file.getvalue())
-            tmp_path = tmp.name
-
-        df_excel = pd.read_excel(tmp_path, engine='openpyxl')
-
-        required_columns = {
-            'fecha_col': 0,     # Columna A
-            'destino_col': 3,   # Columna D
-            'empresa_col': 11,  # Columna L
-            'hora_col': 14      # Columna O
-        }
-
-        if len(df_excel.columns) < max(required_columns.values()) + 1:
-            st.error("El archivo no tiene el formato esperado.")
-            st.stop()
-
-        fecha_col = df_excel.columns[required_columns['fecha_col']]
-        destino_col = df_excel.columns[required_columns['destino_col']]
-        empresa_col = df_excel.columns[required_columns['empresa_col']]
-        hora_col = df_excel.columns[required_columns['hora_col']]
-
-        df_excel = df_excel.dropna(subset=[fecha_col, destino_col, empresa_col, hora_col])
-
-        df_excel[fecha_col] = pd.to_datetime(df_excel[fecha_col], errors='coerce', dayfirst=True)
-        df_excel[hora_col] = pd.to_datetime(df_excel[hora_col], format='%H:%M:%S', errors='coerce').dt.hour
-
-        df_excel[empresa_col] = df_excel[empresa_col].apply(normalizar_nombre_empresa)
+        if uploaded_files:
+            libros = libros_subidos(uploaded_files)
+            with diag.etapa("lectura_excel", n_bytes=sum(map(len, libros.values()))) as registro:
+                clave_excel = clave_conjunto(libros)
+                try:
+                    df_excel = cargar_excels(libros)
+                except FormatoInvalido as e:
+                    st.error(str(e))
+                    st.stop()
+                registro['filas'] = len(df_excel)
+            for nombre, motivo in df_excel.attrs.get('rechazados', {}).items():
+                st.warning(f"Se omitió {nombre}: {motivo}")
+            if len(libros) > 1 or df_excel['hoja'].nunique() > 1:
+                st.caption(
+                    f"{len(df_excel):,} filas de {len(libros)} archivo(s) y "
+                    f"{df_excel.groupby(['archivo', 'hoja'], observed=True).ngroups} hoja(s)."
+                )
+            bytes_compactos = tamano_dataframe(df_excel)
+            if 'bytes_crudos' in df_excel.attrs:
+                st.caption(
+                    f"Memoria de los datos: {df_excel.attrs['bytes_crudos'] / 2**20:.1f} MB al leer → "
+                    f"{bytes_compactos / 2**20:.1f} MB compactados"
+                )
+            if almacen is not None:
+                with diag.etapa("almacen_ingreso", filas=len(df_excel)):
+                    # Cada libro se ingresa una vez por su hash; el histórico descarta los
+                    # despachos que ya tenía de otro libro. Las filas del libro solo se
+                    # separan si todavía no se ingresó
+                    nuevas = sum(
+                        almacen.ingresar(clave, partial(filas_de_archivo, df_excel, nombre))
+                        for nombre, clave in libros
+                    )
+                if nuevas:
+                    st.caption(f"{nuevas} despachos nuevos guardados en el histórico.")
+
+        if fuente == "Archivo cargado":
+            clave_datos = clave_excel
+            with diag.etapa("cubo", filas=len(df_excel)):
+                cubo = obtener_cubo(clave_datos, df_excel)
+            fechas_disponibles = cubo.fechas
+        else:
+            # Todo lo que sale del histórico se memoriza por versión: mientras no se
+            # ingresen archivos, mover filtros no vuelve a consultar SQLite
+            version_almacen = almacen.version()
+            fechas_disponibles = cache_vistas.obtener(('almacen_fechas', version_almacen), almacen.fechas)
 
-        fechas_disponibles = df_excel[fecha_col].dropna().dt.date.unique()
         if len(fechas_disponibles) == 0:
-            st.warning("No se encontraron fechas válidas en el archivo.")
+            if fuente == "Archivo cargado":
+                st.warning("No se encontraron fechas válidas en el archivo.")
+            else:
+                st.warning("El histórico todavía no tiene datos.")
         else:
+            if st.checkbox("📈 Mostrar tendencia multi-día"):
+                rango = st.date_input(
+                    "Rango de fechas:",
+                    value=(min(fechas_disponibles), max(fechas_disponibles)),
+                    min_value=min(fechas_disponibles),
+                    max_value=max(fechas_disponibles),
+                    key="rango_tendencia"
+                )
+                # Mientras se elige el rango, date_input entrega una sola fecha
+                if isinstance(rango, tuple) and len(rango) == 2:
+                    desde, hasta = rango
+                    if fuente == "Histórico almacenado":
+                        clave_rango = f"almacen:{version_almacen}:{desde}:{hasta}"
+                        with diag.etapa("cubo"):
+                            cubo_rango = obtener_cubo(clave_rango, partial(consultar_almacen, almacen, desde, hasta))
+                    else:
+                        clave_rango, cubo_rango = clave_datos, cubo
+                    empresas_t = st.multiselect("Empresas:", cubo_rango.empresas, default=cubo_rango.empresas,
+                                                key="empresas_tendencia")
+                    destinos_t = st.multiselect("Destinos:", cubo_rango.destinos, default=cubo_rango.destinos,
+                                                key="destinos_tendencia")
+                    with diag.etapa("tendencia"):
+                        figuras = cache_vistas.obtener(
+                            ('tendencia', clave_rango, desde, hasta,
+                             normalizar_seleccion(empresas_t), normalizar_seleccion(destinos_t)),
+                            partial(_vista_tendencia, cubo_rango, desde, hasta, empresas_t, destinos_t)
+                        )
+                        if not figuras:
+                            st.info("No hay datos en el rango seleccionado.")
+                        else:
+                            for fig in figuras:
+                                st.plotly_chart(fig, use_container_width=True)
+                st.markdown("---")
+
             fecha_sel = st.date_input(
                 "Selecciona la fecha:",
                 min_value=min(fechas_disponibles),
                 max_value=max(fechas_disponibles),
                 value=min(fechas_disponibles)
             )
-            df_filtrado = df_excel[df_excel[fecha_col].dt.date == fecha_sel]
-            destinos = sorted(df_filtrado[destino_col].dropna().unique())
+            if fuente == "Histórico almacenado":
+                clave_datos = f"almacen:{version_almacen}:{fecha_sel}"
+                with diag.etapa("cubo"):
+                    cubo = obtener_cubo(clave_datos, partial(consultar_almacen, almacen, fecha_sel))
+            corte = cubo.corte(fecha_sel)
+            destinos = corte.destinos_presentes()
             destinos_sel = st.multiselect("Selecciona destino(s):", destinos, default=list(destinos))
-            empresas = sorted(df_filtrado[empresa_col].dropna().unique())
+            empresas = corte.empresas_presentes()
             empresas_sel = st.multiselect("Selecciona empresa(s):", empresas, default=list(empresas))
 
-            df_filtrado = df_filtrado[
-                df_filtrado[destino_col].isin(destinos_sel) &
-                df_filtrado[empresa_col].isin(empresas_sel)
-            ]
+            # Los cortes filtrados y las vistas se memorizan por dataset y filtros normalizados
+            # (compartidos entre sesiones): volver a una combinación ya vista no recalcula
+            filtros = (clave_datos, fecha_sel, normalizar_seleccion(destinos_sel))
+            with diag.etapa("filtros"):
+                corte = cache_vistas.obtener(
+                    ('corte',) + filtros + (normalizar_seleccion(empresas_sel),),
+                    partial(corte.filtrar, destinos_sel, empresas_sel)
+                )
 
-            horas = df_filtrado[hora_col].dropna().unique()
+            horas = corte.horas_presentes()
+            hora_rango = None
             if len(horas) > 0:
                 min_hora, max_hora = int(min(horas)), int(max(horas))
                 hora_rango = st.slider("Selecciona rango de horas:", min_hora, max_hora, (min_hora, max_hora), step=1)
-                df_filtrado = df_filtrado[(df_filtrado[hora_col] >= hora_rango[0]) & (df_filtrado[hora_col] <= hora_rango[1])]
+                with diag.etapa("filtros"):
+                    corte = cache_vistas.obtener(
+                        ('corte',) + filtros + (normalizar_seleccion(empresas_sel), hora_rango),
+                        partial(corte.filtrar_horas, hora_rango[0], hora_rango[1])
+                    )
 
-            horas_labels = [f"{str(h).zfill(2)}:00 - {str(h).zfill(2)}:59" for h in range(24)]
-            df_filtrado['Hora Intervalo'] = df_filtrado[hora_col].apply(
-                lambda h: f"{str(int(h)).zfill(2)}:00 - {str(int(h)).zfill(2)}:59"
-            )
+            if empresas_sel:
+                st.subheader("📦 Generar reportes de todas las empresas")
+                col_zip, col_excel = st.columns(2)
+                if col_zip.button("Generar ZIP con todos los PDF"):
+                    encolar_reporte(
+                        ('zip',) + filtros + (normalizar_seleccion(empresas_sel), hora_rango),
+                        f"ZIP {fecha_sel} ({len(empresas_sel)} empresas)",
+                        f"dashboards_{fecha_sel}.zip",
+                        "application/zip",
+                        partial(_zip_empresas, corte, list(empresas_sel))
+                    )
+                if col_excel.button("Generar Excel con todas las tablas"):
+                    encolar_reporte(
+                        ('xlsx',) + filtros + (normalizar_seleccion(empresas_sel), hora_rango),
+                        f"Excel {fecha_sel} ({len(empresas_sel)} empresas)",
+                        f"tablas_{fecha_sel}.xlsx",
+                        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        partial(_excel_empresas, corte, list(empresas_sel), f"Equipos por hora {fecha_sel}")
+                    )
 
-            for empresa in empresas_sel:
-                empresa_normalizada = normalizar_nombre_empresa(empresa)
+            # Solo se construye la empresa visible; su vista no depende de qué otras
+            # empresas estén seleccionadas
+            if empresas_sel:
+                empresa = st.radio("Empresa a visualizar:", empresas_sel, horizontal=True, key="empresa_vista")
+                clave_vista = filtros + (hora_rango, empresa)
+                with diag.etapa("resumen_empresa"):
+                    resumen, tabla_final, fig = cache_vistas.obtener(
+                        ('vista',) + clave_vista, partial(_vista_empresa, corte, empresa)
+                    )
                 st.markdown(f"---\n### Empresa: {empresa}")
 
                 col1, col2 = st.columns([2, 2])
                 with col1:
-                    try:
-                        if os.path.exists(BANNER_PATH):
-                            st.image(BANNER_PATH, use_container_width=True)
-                        logo_path = LOGOS.get(empresa_normalizada)
-                        if logo_path and os.path.exists(logo_path):
-                            st.image(logo_path, width=120)
-                        else:
-                            st.info(f"No se encontró logo para {empresa}")
-                    except Exception as e:
-                        st.warning(f"Error al cargar imágenes: {str(e)}")
-
-                    df_empresa = df_filtrado[df_filtrado[empresa_col] == empresa_normalizada]
-                    resumen = df_empresa.groupby([hora_col, destino_col]).size().reset_index(name='Cantidad')
-
-                    if not resumen.empty:
-                        destinos_unicos = resumen[destino_col].unique()
-                        color_map = {dest: COLOR_PALETTE[i % len(COLOR_PALETTE)] for i, dest in enumerate(destinos_unicos)}
-                        fig = px.line(
-                            resumen,
-                            x=hora_col,
-                            y="Cantidad",
-                            color=destino_col,
-                            markers=True,
-                            labels={
-                                hora_col: "Hora de Entrada",
-                                "Cantidad": "Cantidad de Equipos",
-                                destino_col: "Destino"
-                            },
-                            color_discrete_map=color_map
-                        )
-                        fig.update_layout(xaxis=dict(dtick=1), title=f"Cantidad de equipos por hora - {empresa}")
-                        st.plotly_chart(fig, use_container_width=True)
+                    if recursos.banner_png:
+                        st.image(recursos.banner_png, use_container_width=True)
+                    if empresa in recursos.logos_png:
+                        st.image(recursos.logos_png[empresa], width=120)
+                    else:
+                        st.info(f"No se encontró logo para {empresa}")
+
+                    if fig is not None:
+                        with diag.etapa("grafico_plotly", filas=len(resumen)):
+                            st.plotly_chart(fig, use_container_width=True)
                     else:
                         st.info("No hay datos para los filtros seleccionados.")
 
                 with col2:
-                    tabla = pd.pivot_table(
-                        df_empresa,
-                        index='Hora Intervalo',
-                        columns=destino_col,
-                        values=empresa_col,
-                        aggfunc='count',
-                        fill_value=0
-                    )
-                    tabla = tabla.reindex(horas_labels, fill_value=0)
-                    sumatoria = pd.DataFrame(tabla.sum(axis=0)).T
-                    sumatoria.index = ['TOTAL']
-                    tabla_final = pd.concat([tabla, sumatoria])
-                    st.dataframe(tabla_final.style.format(na_rep="0", precision=0))
+                    with diag.etapa("tabla_empresa"):
+                        st.dataframe(tabla_final.style.format(na_rep="0", precision=0))
 
                 st.markdown("---")
                 st.subheader(f"📄 Generar PDF para {empresa}")
 
                 if st.button(f"Generar PDF para {empresa}"):
-                    try:
-                        with tempfile.TemporaryDirectory() as tmpdir:
-                            grafico_path = os.path.join(tmpdir, f"grafico_{empresa}.png")
-                            fig.write_image(grafico_path, width=900, height=400, scale=2)
-
-                            images_to_stack = []
-                            opened_imgs = []
-
-                            if os.path.exists(BANNER_PATH):
-                                banner_img = Image.open(BANNER_PATH)
-                                images_to_stack.append(banner_img)
-                                opened_imgs.append(banner_img)
-
-                            logo_path = LOGOS.get(empresa_normalizada)
-                            if logo_path and os.path.exists(logo_path):
-                                logo_img = Image.open(logo_path)
-                                logo_width = 120
-                                wpercent = (logo_width / float(logo_img.size[0])
-                                hsize = int((float(logo_img.size[1]) * float(wpercent)))
-                                logo_img = logo_img.resize((logo_width, hsize), Image.LANCZOS)
-                                logo_bg = Image.new('RGBA', (900, logo_img.height), (255, 255, 255, 0))
-                                logo_bg.paste(logo_img, ((900 - logo_width)//2, 0), logo_img if logo_img.mode == 'RGBA' else None)
-                                images_to_stack.append(logo_bg.convert('RGB'))
-
-                            grafico_img = Image.open(grafico_path)
-                            images_to_stack.append(grafico_img)
-                            base_width = images_to_stack[-1].width
-                            resized_imgs = []
-                            for img in images_to_stack:
-                                if img.width != base_width:
-                                    wpercent = (base_width / float(img.size[0])
-                                    hsize = int((float(img.size[1]) * float(wpercent)))
-                                    img = img.resize((base_width, hsize), Image.LANCZOS)
-                                resized_imgs.append(img)
-
-                            total_height = sum(img.height for img in resized_imgs)
-                            combined_img = Image.new('RGB', (base_width, total_height), (255, 255, 255))
-                            y_offset = 0
-                            for img in resized_imgs:
-                                combined_img.paste(img, (0, y_offset))
-                                y_offset += img.height
-
-                            combined_path = os.path.join(tmpdir, f"combinado_{empresa}.png")
-                            combined_img.save(combined_path)
-
-                            pdf = FPDF(orientation='L', unit='mm', format='A4')
-                            pdf.add_page()
-                            pdf.set_font("Arial", "B", 16)
-                            pdf.cell(0, 10, f"Empresa: {empresa}", ln=1, align="C")
-                            pdf.ln(5)
-                            pdf.image(combined_path, x=10, y=20, w=270)
-                            pdf.add_page(orientation='P')
-                            pdf.set_font("Arial", "B", 12)
-                            pdf.cell(0, 10, "Tabla de equipos por hora y destino", ln=1, align="C")
-                            pdf.set_font("Arial", "", 8)
-
-                            col_width = max(20, int(180 / (len(tabla_final.columns)+1)))
-                            tabla_reset = tabla_final.reset_index()
-                            hora_col_name = tabla_reset.columns[0]
-
-                            pdf.cell(col_width, 8, "Hora", border=1, align="C")
-                            for col in tabla_final.columns:
-                                pdf.cell(col_width, 8, str(col), border=1, align="C")
-                            pdf.ln()
-                            for idx, row in tabla_reset.iterrows():
-                                hora_label = row[hora_col_name]
-                                if pd.isnull(hora_label):
-                                    hora_label = "TOTAL"
-                                pdf.cell(col_width, 8, str(hora_label), border=1, align="C")
-                                for col in tabla_final.columns:
-                                    pdf.cell(col_width, 8, str(int(row[col])), border=1, align="C")
-                                pdf.ln()
-
-                            pdf_path = os.path.join(tmpdir, f"dashboard_{empresa}.pdf")
-                            pdf.output(pdf_path)
-                            with open(pdf_path, "rb") as f:
-                                pdf_bytes = f.read()
-                            st.download_button(
-                                label=f"⬇️ Descargar PDF para {empresa}",
-                                data=pdf_bytes,
-                                file_name=f"dashboard_{empresa}.pdf",
-                                mime="application/pdf"
-                            )
-
-                    except Exception as e:
-                        st.error(f"Error al generar PDF: {str(e)}")
+                    encolar_reporte(
+                        ('pdf',) + clave_vista,
+                        f"PDF {empresa} {fecha_sel}",
+                        nombre_archivo(empresa),
+                        "application/pdf",
+                        partial(_pdf_empresa, empresa, resumen, tabla_final)
+                    )
+
+            mostrar_reportes()
 
     except Exception as e:
         st.error(f"Error al procesar archivo: {str(e)}")
@@ -570,4 +663,35 @@ if uploaded_file:
 if st.session_state.step == 4:
     if st.button("🔄 Reiniciar formulario"):
         st.session_state.clear()
-        st.rerun()
\ No newline at end of file
+        st.rerun()
+
+# Panel de diagnóstico (al final, cuando ya se midieron todas las etapas)
+if perfil is not None:
+    st.session_state.pop('_perfil_activo', None)
+    st.session_state.perfil_prof, st.session_state.perfil_texto = terminar_perfil(perfil)
+if mostrar_diagnostico:
+    with st.sidebar:
+        st.markdown("**Tiempos por etapa**")
+        st.dataframe(diag.como_dataframe(), hide_index=True, use_container_width=True)
+        etapas_reportes = [e for d in st.session_state.get('diag_reportes', {}).values() for e in d.etapas]
+        if etapas_reportes:
+            st.markdown("**Reportes en segundo plano**")
+            st.dataframe(resumir_etapas(etapas_reportes), hide_index=True, use_container_width=True)
+        uso = cache_datos.estadisticas()
+        st.caption(
+            f"Cache compartida: {uso['entradas']} datasets, {uso['bytes'] / 2**20:.1f} de "
+            f"{uso['max_bytes'] / 2**20:.0f} MB · {uso['aciertos']} aciertos / {uso['fallos']} fallos"
+        )
+        vistas = cache_vistas.estadisticas()
+        st.caption(f"Vistas memorizadas: {vistas['entradas']} · {vistas['aciertos']} aciertos / {vistas['fallos']} fallos")
+        stats = estadisticas_cache_graficos()
+        st.caption(f"Gráficos reutilizados: {stats['aciertos']} · rasterizados: {stats['fallos']}")
+        if 'perfil_prof' in st.session_state:
+            st.download_button(
+                "⬇️ Descargar perfil (.prof)",
+                data=st.session_state.perfil_prof,
+                file_name="perfil.prof",
+                mime="application/octet-stream"
+            )
+            with st.expander("Resumen del perfil"):
+                st.text(st.session_state.perfil_texto)
\ No newline at end of file
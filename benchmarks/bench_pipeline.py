@@ -0,0 +1,149 @@
+"""Mide tiempo y memoria pico de cada etapa del pipeline sobre libros sintéticos.
+
+Uso:
+    python benchmarks/bench_pipeline.py --filas 10000 100000 1000000 --salida bench_resultados.json
+
+Los libros generados se guardan en --datos y se reutilizan entre corridas. Cada etapa se
+ejecuta una vez para medir el tiempo y otra con tracemalloc para la memoria pico, porque el
+trazado distorsiona los tiempos.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pandas as pd  # noqa: E402
+
+from agregacion import CuboDespachos  # noqa: E402
+from generar_datos import N_EMPRESAS, generar_libro  # noqa: E402
+from ingesta import leer_excel, parsear_horas  # noqa: E402
+from normalizacion import normalizar_serie  # noqa: E402
+from reportes import _rasterizar, generar_pdf_empresa  # noqa: E402
+
+
+def _ejecutar(funcion, args, trazar):
+    if trazar:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        valor, error = funcion(*args), None
+    except Exception as e:  # p. ej. kaleido sin navegador disponible
+        valor, error = None, f"{type(e).__name__}: {e}"
+    segundos = time.perf_counter() - inicio
+    pico = None
+    if trazar:
+        pico = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return valor, error, segundos, pico
+
+
+def medir(resultados, filas, etapa, funcion, *args, memoria=True):
+    """Ejecuta la etapa sin trazar (tiempo) y, si se pide, otra vez con tracemalloc (memoria pico)."""
+    valor, error, segundos, _ = _ejecutar(funcion, args, trazar=False)
+    pico = None
+    if memoria and error is None:
+        _, _, _, pico = _ejecutar(funcion, args, trazar=True)
+
+    resultados.append({
+        'filas': filas,
+        'etapa': etapa,
+        'segundos': round(segundos, 4),
+        'memoria_pico_mb': None if pico is None else round(pico, 2),
+        'error': error
+    })
+    if error:
+        estado = "ERROR " + " ".join(error.split())[:100]
+    else:
+        estado = f"{segundos:8.3f} s" + ("" if pico is None else f"  {pico:8.1f} MB")
+    print(f"{filas:>9} {etapa:<14} {estado}", file=sys.stderr)
+    return valor
+
+
+def _parsear_fechas_horas(df):
+    df = df.copy()
+    df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce', dayfirst=True)
+    df['hora'] = parsear_horas(df['hora'])
+    return df.dropna(subset=['fecha', 'hora']).astype({'hora': 'uint8'})
+
+
+def _tablas_por_empresa(cubo):
+    return [cubo.corte(fecha).tabla(empresa) for fecha in cubo.fechas for empresa in cubo.empresas]
+
+
+def bench_filas(filas, datos_dir, extension, resultados, memoria=True):
+    ruta = Path(datos_dir) / f"despachos_{filas}{extension}"
+    if not ruta.exists():
+        print(f"Generando {ruta}...", file=sys.stderr)
+        generar_libro(filas, ruta)
+    datos = ruta.read_bytes()
+
+    crudo = medir(resultados, filas, "lectura_excel", leer_excel, datos, memoria=memoria)
+    crudo = crudo.dropna()
+    # Se mide la normalización exacta, la de producción (la aproximada es opcional)
+    empresas = medir(resultados, filas, "normalizacion", normalizar_serie, crudo['empresa'], memoria=memoria)
+    if empresas.nunique() != N_EMPRESAS:
+        # Con otra cantidad de empresas las etapas siguientes no son comparables entre corridas
+        raise SystemExit(
+            f"Las variantes de empresa dieron {empresas.nunique()} empresas y no {N_EMPRESAS}: "
+            "revisar normalizacion.EQUIVALENCIAS"
+        )
+    df = medir(resultados, filas, "fechas_horas", _parsear_fechas_horas, crudo.assign(empresa=empresas), memoria=memoria)
+    cubo = medir(resultados, filas, "cubo", CuboDespachos.desde_dataframe, df, memoria=memoria)
+    medir(resultados, filas, "tablas_empresa", _tablas_por_empresa, cubo, memoria=memoria)
+
+    corte = cubo.corte(cubo.fechas[0])
+    empresa = corte.empresas_presentes()[0]
+    resumen, tabla = corte.resumen(empresa), corte.tabla(empresa)
+    medir(resultados, filas, "rasterizacion", _rasterizar, resumen, empresa, memoria=memoria)
+    # Sin gráfico: mide la composición de imágenes y la salida FPDF
+    medir(resultados, filas, "pdf_tabla", generar_pdf_empresa, empresa, resumen, tabla, b"", memoria=memoria)
+
+
+def _version():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de ingesta, agregación y PDF.")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument(
+        "--formato", choices=[".xlsx", ".xlsm"], default=".xlsx",
+        help="Extensión de los libros generados; .xlsm no agrega macros, solo cambia el nombre del archivo"
+    )
+    parser.add_argument("--datos", default=str(RAIZ / "benchmarks" / "datos"), help="Directorio de libros generados")
+    parser.add_argument("--salida", default="bench_resultados.json")
+    parser.add_argument("--sin-memoria", action="store_true", help="No medir memoria pico (evita repetir cada etapa)")
+    args = parser.parse_args(argv)
+
+    Path(args.datos).mkdir(parents=True, exist_ok=True)
+    resultados = []
+    for filas in args.filas:
+        bench_filas(filas, args.datos, args.formato, resultados, memoria=not args.sin_memoria)
+
+    informe = {
+        'version': _version(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'resultados': resultados
+    }
+    Path(args.salida).write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"Resultados en {args.salida}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Genera libros de despachos sintéticos con el formato A/D/L/O del dashboard.
+
+Uso:
+    python benchmarks/generar_datos.py 100000 despachos_100k.xlsx
+"""
+import argparse
+import random
+from datetime import datetime, time, timedelta
+
+import openpyxl
+
+# Variantes que normalizar_nombre_empresa unifica en 5 empresas (sin búsqueda aproximada)
+EMPRESAS = [
+    "M&Q SPA", "M AND Q", "m & q spa", "MINING AND QUARRYING SPA", "MINING AND QUARRYNG SPA",
+    "M S & D SPA", "MS&D SPA", "m.s.d. spa", "MINING SERVICES AND DERIVATES",
+    "JORQUERA TRANSPORTE S. A.", "Jorquera Transporte S.A.",
+    "AG SERVICE SPA", "AG  Services  SpA",
+    "COSEDUCAM S A", "Coseducam S.A."
+]
+N_EMPRESAS = 5
+DESTINOS = [
+    "Puerto Angamos", "Mejillones", "Calama", "Tocopilla", "Antofagasta, P De Litio",
+    "Pta. Npt 2", "Pta. Muriato", "Centro Logístico Baquedano", "Santiago", "Taltal"
+]
+N_COLUMNAS = 20
+
+
+def _hora(rng, h, m):
+    formato = rng.randrange(4)
+    if formato == 0:
+        return time(h, m, rng.randrange(60))
+    if formato == 1:
+        return f"{h:02d}:{m:02d}:00"
+    if formato == 2:
+        return f"{h}:{m:02d}"
+    return (h * 60 + m) / 1440  # Serial de Excel (fracción del día)
+
+
+def generar_libro(filas, ruta, dias=30, semilla=0):
+    rng = random.Random(semilla)
+    inicio = datetime(2025, 3, 1)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Despachos")
+
+    encabezado = [f"Col{i}" for i in range(N_COLUMNAS)]
+    encabezado[0], encabezado[3], encabezado[11], encabezado[14] = "Fecha", "Destino", "Empresa", "Hora Entrada"
+    ws.append(encabezado)
+
+    relleno = [None] * N_COLUMNAS
+    for i in range(filas):
+        fecha = inicio + timedelta(days=rng.randrange(dias))
+        # Horas con picos de congestión en la mañana y la tarde
+        h = min(23, max(0, int(rng.choice([rng.gauss(8, 2), rng.gauss(16, 3), rng.uniform(0, 24)]))))
+        fila = list(relleno)
+        fila[0] = fecha if i % 3 else fecha.strftime("%d/%m/%Y")
+        fila[1] = i
+        fila[3] = rng.choice(DESTINOS)
+        fila[11] = rng.choice(EMPRESAS)
+        fila[14] = _hora(rng, h, rng.randrange(60))
+        fila[17] = rng.uniform(20, 45)  # Tonelaje
+        ws.append(fila)
+
+    wb.save(ruta)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un libro de despachos sintético.")
+    parser.add_argument("filas", type=int)
+    parser.add_argument(
+        "ruta", help="Archivo de salida; con .xlsm solo cambia la extensión (libro sin macros ni vbaProject)"
+    )
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argv)
+    generar_libro(args.filas, args.ruta, args.dias, args.semilla)
+
+
+if __name__ == "__main__":
+    main()
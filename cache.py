@@ -0,0 +1,122 @@
+from collections import OrderedDict
+import os
+import threading
+import time
+
+
+class CacheLRU:
+    """Cache en memoria acotada por número de entradas (y opcionalmente bytes), con expulsión LRU.
+
+    Con `ttl` (segundos) las entradas vencen aunque se sigan usando.
+    """
+
+    def __init__(self, max_entradas=8, max_bytes=None, ttl=None):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._tamanos = {}
+        self._creados = {}
+        self._lock = threading.Lock()
+        self._calculando = {}
+        self.bytes_usados = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _vencida(self, clave, ahora):
+        return self.ttl is not None and ahora - self._creados[clave] > self.ttl
+
+    def _quitar(self, clave):
+        del self._datos[clave]
+        del self._creados[clave]
+        self.bytes_usados -= self._tamanos.pop(clave)
+
+    def get(self, clave, default=None):
+        with self._lock:
+            if clave in self._datos and self._vencida(clave, time.monotonic()):
+                self._quitar(clave)
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return self._datos[clave]
+            self.fallos += 1
+            return default
+
+    def put(self, clave, valor, tamano=0):
+        with self._lock:
+            ahora = time.monotonic()
+            for vieja in [c for c in self._datos if c != clave and self._vencida(c, ahora)]:
+                self._quitar(vieja)
+            self.bytes_usados += tamano - self._tamanos.get(clave, 0)
+            self._datos[clave] = valor
+            self._tamanos[clave] = tamano
+            self._creados[clave] = ahora
+            self._datos.move_to_end(clave)
+            while len(self._datos) > 1 and (
+                len(self._datos) > self.max_entradas
+                or (self.max_bytes is not None and self.bytes_usados > self.max_bytes)
+            ):
+                self._quitar(next(iter(self._datos)))
+
+    def obtener(self, clave, calcular, medir=None):
+        """Devuelve la entrada o la calcula una sola vez aunque la pidan varios hilos a la vez.
+
+        `medir(valor)` entrega el tamaño en bytes que se descuenta del presupuesto.
+        """
+        valor = self.get(clave)
+        if valor is not None:
+            return valor
+        with self._lock:
+            lock_clave = self._calculando.setdefault(clave, threading.Lock())
+        with lock_clave:
+            # Otro hilo pudo haberla calculado mientras esperábamos
+            with self._lock:
+                if clave in self._datos and not self._vencida(clave, time.monotonic()):
+                    self._datos.move_to_end(clave)
+                    return self._datos[clave]
+            try:
+                valor = calcular()
+                self.put(clave, valor, medir(valor) if medir else 0)
+            finally:
+                with self._lock:
+                    self._calculando.pop(clave, None)
+        return valor
+
+    def __contains__(self, clave):
+        with self._lock:
+            return clave in self._datos
+
+    def __len__(self):
+        return len(self._datos)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+            self._tamanos.clear()
+            self._creados.clear()
+            self.bytes_usados = 0
+
+    def estadisticas(self):
+        return {
+            'entradas': len(self._datos),
+            'bytes': self.bytes_usados,
+            'max_bytes': self.max_bytes,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos
+        }
+
+
+# Cache de datasets compartida por todas las sesiones del proceso (DataFrames limpios y
+# cubos de conteo), con presupuesto de memoria y vencimiento configurables
+cache_datos = CacheLRU(
+    max_entradas=int(os.environ.get("INFORME_CACHE_ENTRADAS", 64)),
+    max_bytes=int(float(os.environ.get("INFORME_CACHE_MB", 1024)) * 2**20),
+    ttl=float(os.environ.get("INFORME_CACHE_TTL", 3600)) or None
+)
+
+# Cortes filtrados, vistas por empresa y figuras, indexados por dataset y filtros
+# normalizados; se acota por entradas porque cada una es pequeña
+cache_vistas = CacheLRU(
+    max_entradas=int(os.environ.get("INFORME_CACHE_VISTAS", 512)),
+    ttl=cache_datos.ttl
+)
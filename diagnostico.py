@@ -0,0 +1,107 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from uuid import uuid4
+
+import pandas as pd
+
+# Archivo JSON Lines donde se agregan los tiempos por etapa; sin definir no se escribe nada
+RUTA_LOG = os.environ.get("INFORME_DIAGNOSTICO_LOG", "")
+
+# Tamaño del archivo antes de rotarlo (se conservan los 3 anteriores como .1, .2 y .3)
+MAX_MB_LOG = float(os.environ.get("INFORME_DIAGNOSTICO_MB", 10))
+
+_loggers = {}
+_lock_loggers = threading.Lock()
+
+
+def _logger_etapas(ruta):
+    """Logger que agrega una línea por etapa a `ruta`; uno por archivo y proceso, con el archivo abierto."""
+    with _lock_loggers:
+        if ruta not in _loggers:
+            logger = logging.getLogger(f"{__name__}.etapas.{len(_loggers)}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            manejador = RotatingFileHandler(
+                ruta, maxBytes=int(MAX_MB_LOG * 2**20), backupCount=3, encoding='utf-8', delay=True
+            )
+            manejador.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(manejador)
+            _loggers[ruta] = logger
+        return _loggers[ruta]
+
+
+class Diagnostico:
+    """Tiempos y contadores (filas/bytes) de las etapas de una ejecución."""
+
+    def __init__(self, ruta_log=RUTA_LOG):
+        self.ruta_log = ruta_log
+        self.ejecucion = uuid4().hex[:12]
+        self.etapas = []
+
+    @contextmanager
+    def etapa(self, nombre, filas=None, n_bytes=None):
+        """Mide el bloque; el registro entregado permite completar filas/bytes al terminar."""
+        registro = {'etapa': nombre, 'filas': filas, 'bytes': n_bytes}
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro['segundos'] = round(time.perf_counter() - inicio, 4)
+            self.etapas.append(registro)
+            self._escribir_log(registro)
+
+    def _escribir_log(self, registro):
+        if not self.ruta_log:
+            return
+        linea = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'ejecucion': self.ejecucion,
+            **registro
+        }
+        _logger_etapas(self.ruta_log).info(json.dumps(linea, ensure_ascii=False, default=str))
+
+    def como_dataframe(self):
+        return resumir_etapas(self.etapas)
+
+
+def resumir_etapas(etapas):
+    """Etapas agrupadas por nombre (las por empresa se suman)."""
+    if not etapas:
+        return pd.DataFrame(columns=['etapa', 'veces', 'segundos', 'filas', 'bytes'])
+    df = pd.DataFrame(list(etapas))
+    return (
+        df.groupby('etapa', sort=False)
+        .agg(veces=('segundos', 'size'), segundos=('segundos', 'sum'),
+             filas=('filas', 'sum'), bytes=('bytes', 'sum'))
+        .reset_index()
+    )
+
+
+def iniciar_perfil():
+    perfil = cProfile.Profile()
+    perfil.enable()
+    return perfil
+
+
+def terminar_perfil(perfil, lineas=40):
+    """Detiene el perfil y devuelve (archivo .prof en bytes, resumen de texto por tiempo acumulado)."""
+    perfil.disable()
+    texto = io.StringIO()
+    stats = pstats.Stats(perfil, stream=texto)
+    stats.sort_stats('cumulative').print_stats(lineas)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        ruta = os.path.join(tmpdir, "perfil.prof")
+        stats.dump_stats(ruta)
+        with open(ruta, 'rb') as f:
+            return f.read(), texto.getvalue()
@@ -0,0 +1,110 @@
+"""Generación de los PDFs por empresa sin interfaz (para cron o tareas programadas).
+
+Uso:
+    python generar_reportes.py despachos.xlsx [otros.xlsm ...] --desde 2025-03-01 --hasta 2025-03-31 --salida reportes/
+"""
+import argparse
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+from agregacion import CuboDespachos
+from ingesta import cargar_excels, hash_contenido, identificar_libros
+from reportes import generar_pdfs, nombre_archivo
+from tabla_excel import generar_excel_empresas
+
+
+@contextmanager
+def _etapa(nombre, tiempos):
+    inicio = time.perf_counter()
+    yield
+    tiempos[nombre] = time.perf_counter() - inicio
+    print(f"{nombre}: {tiempos[nombre]:.2f} s", file=sys.stderr)
+
+
+def cargar_archivos(rutas):
+    """Lee y normaliza uno o más libros de Excel (todas sus hojas, en paralelo) en un solo DataFrame."""
+    contenidos = [(str(ruta), Path(ruta).read_bytes()) for ruta in rutas]
+    return cargar_excels(identificar_libros((ruta, hash_contenido(datos), datos) for ruta, datos in contenidos))
+
+
+def trabajos_reporte(cubo, desde=None, hasta=None, empresas=None):
+    """Arma los trabajos de PDF (fecha, empresa) del rango a partir del cubo de conteos."""
+    trabajos = {}
+    for fecha in cubo.fechas:
+        if (desde and fecha < desde) or (hasta and fecha > hasta):
+            continue
+        corte = cubo.corte(fecha)
+        for empresa in corte.empresas_presentes():
+            if empresas and empresa not in empresas:
+                continue
+            trabajos[(fecha, empresa)] = (empresa, corte.resumen(empresa), corte.tabla(empresa))
+    return trabajos
+
+
+def escribir_excels(trabajos, salida):
+    """Escribe en `salida/<fecha>/` un .xlsx por día con una hoja por empresa."""
+    por_fecha = {}
+    for (fecha, empresa), (_, _, tabla) in trabajos.items():
+        por_fecha.setdefault(fecha, {})[empresa] = tabla
+    for fecha, tablas in por_fecha.items():
+        destino = Path(salida) / str(fecha)
+        destino.mkdir(parents=True, exist_ok=True)
+        (destino / f"tablas_{fecha}.xlsx").write_bytes(generar_excel_empresas(tablas, f"Equipos por hora {fecha}"))
+
+
+def generar_reportes(rutas, salida, desde=None, hasta=None, empresas=None, max_procesos=None, excel=False):
+    """Escribe en `salida/<fecha>/` un PDF por empresa y día (y, si se pide, el Excel del día).
+
+    Un PDF que falla no detiene los demás. Devuelve (tiempos por etapa, {(fecha, empresa): error}).
+    """
+    tiempos = {}
+    with _etapa("lectura", tiempos):
+        df = cargar_archivos(rutas)
+    for nombre, motivo in df.attrs.get('rechazados', {}).items():
+        print(f"Se omitió {nombre}: {motivo}", file=sys.stderr)
+    with _etapa("agregacion", tiempos):
+        cubo = CuboDespachos.desde_dataframe(df)
+        trabajos = trabajos_reporte(cubo, desde, hasta, empresas)
+    if excel:
+        with _etapa("excel", tiempos):
+            escribir_excels(trabajos, salida)
+    usados = {}
+    nombres = {(fecha, empresa): nombre_archivo(empresa, usados.setdefault(fecha, set())) for fecha, empresa in trabajos}
+    errores = {}
+    with _etapa("pdf", tiempos):
+        for (fecha, empresa), pdf_bytes, error in generar_pdfs(trabajos, max_procesos):
+            if error:
+                errores[(fecha, empresa)] = error
+                print(f"Error en {fecha} {empresa}: {' '.join(error.split())}", file=sys.stderr)
+                continue
+            destino = Path(salida) / str(fecha)
+            destino.mkdir(parents=True, exist_ok=True)
+            (destino / nombres[(fecha, empresa)]).write_bytes(pdf_bytes)
+    resumen = f"{len(trabajos) - len(errores)} reportes escritos en {salida}"
+    print(resumen + (f"; {len(errores)} con error" if errores else ""), file=sys.stderr)
+    return tiempos, errores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera los PDFs de equipos por hora para cada empresa.")
+    parser.add_argument("archivos", nargs="+", help="Libros .xlsx/.xlsm de despachos")
+    parser.add_argument("--desde", type=date.fromisoformat, help="Fecha inicial (AAAA-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, help="Fecha final (AAAA-MM-DD)")
+    parser.add_argument("--empresa", action="append", dest="empresas", help="Limitar a una empresa (repetible)")
+    parser.add_argument("--salida", default="reportes", help="Directorio de salida")
+    parser.add_argument("--procesos", type=int, help="Procesos en paralelo (por defecto, uno por CPU)")
+    parser.add_argument("--excel", action="store_true", help="Escribir también un .xlsx por día con las tablas")
+    args = parser.parse_args(argv)
+
+    _, errores = generar_reportes(
+        args.archivos, args.salida, args.desde, args.hasta, args.empresas, args.procesos, args.excel
+    )
+    # Código de salida distinto de cero para que cron avise de reportes faltantes
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import unicodedata
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from cache import cache_datos
+from normalizacion import APROXIMADO, normalizar_serie
+
+# Posiciones de las columnas usadas en el Excel de despachos
+REQUIRED_COLUMNS = {
+    'fecha_col': 0,     # Columna A
+    'destino_col': 3,   # Columna D
+    'empresa_col': 11,  # Columna L
+    'hora_col': 14      # Columna O
+}
+COLUMNAS = ['fecha', 'destino', 'empresa', 'hora']
+
+# Encabezados reconocidos para cada columna (sin tildes ni mayúsculas); también se
+# aceptan encabezados que empiezan con ellos, como "Hora Entrada"
+ENCABEZADOS = {
+    'fecha': ('fecha', 'fecha despacho', 'dia'),
+    'destino': ('destino', 'destinatario'),
+    'empresa': ('empresa', 'empresa transportista', 'transportista', 'transporte'),
+    'hora': ('hora', 'hora entrada', 'hora de entrada', 'hora despacho')
+}
+# Filas revisadas al buscar el encabezado y al validar una muestra de datos
+FILAS_ENCABEZADO = 10
+FILAS_MUESTRA = 50
+# Origen de cada fila cuando se combinan varias hojas o archivos
+COLUMNAS_ORIGEN = ['archivo', 'hoja']
+
+# Directorio para los archivos Parquet auxiliares ("" desactiva el disco)
+CACHE_DIR = os.environ.get("INFORME_CACHE_DIR", str(Path(__file__).parent / ".cache_excel"))
+
+# Se incrementa cuando cambia el esquema del DataFrame limpio o cómo se interpretan las celdas
+VERSION_SIDECAR = 10
+
+# Procesos para leer hojas en paralelo (por defecto, uno por CPU)
+MAX_PROCESOS_LECTURA = int(os.environ.get("INFORME_PROCESOS_LECTURA", 0)) or None
+
+
+_log = logging.getLogger(__name__)
+_aviso_sidecar = False
+
+
+class FormatoInvalido(ValueError):
+    """El archivo no tiene las columnas esperadas."""
+
+
+def hash_contenido(datos):
+    return hashlib.sha256(datos).hexdigest()
+
+
+def _normalizar_encabezado(valor):
+    texto = unicodedata.normalize('NFKD', str(valor)).encode('ascii', 'ignore').decode()
+    return ' '.join(texto.lower().replace('_', ' ').replace('.', ' ').split())
+
+
+def _buscar_columnas(fila):
+    """Posición de cada columna según los encabezados de la fila, o None si falta alguna."""
+    textos = [_normalizar_encabezado(v) if v is not None else "" for v in fila]
+    posiciones = {}
+    for columna, alias in ENCABEZADOS.items():
+        exactas = [i for i, t in enumerate(textos) if t in alias]
+        prefijos = [i for i, t in enumerate(textos) if any(t.startswith(a + ' ') for a in alias)]
+        candidatas = [i for i in exactas + prefijos if i not in posiciones.values()]
+        if not candidatas:
+            return None
+        posiciones[columna] = candidatas[0]
+    return posiciones
+
+
+def _muestra_valida(filas, posiciones):
+    """Al menos una fila de la muestra tiene fecha y hora interpretables (o no hay filas)."""
+    muestra = [f for f in filas if any(v is not None for v in f)]
+    if not muestra:
+        return True
+    valores = {c: pd.Series([f[p] if p < len(f) else None for f in muestra], dtype=object)
+               for c, p in posiciones.items()}
+    fechas = pd.to_datetime(valores['fecha'].astype(str), errors='coerce', dayfirst=True, format='mixed')
+    horas = parsear_horas(valores['hora'])
+    return bool((fechas.notna() & horas.notna()).any())
+
+
+def detectar_columnas(ws):
+    """Ubica las columnas revisando solo las primeras filas de la hoja.
+
+    Busca una fila de encabezado con fecha/destino/empresa/hora entre las primeras
+    FILAS_ENCABEZADO; si no la encuentra, usa las posiciones fijas A/D/L/O. Devuelve
+    (primera fila de datos, {columna: posición}) o lanza FormatoInvalido.
+    """
+    primeras = list(ws.iter_rows(max_row=FILAS_ENCABEZADO + FILAS_MUESTRA, values_only=True))
+    if not primeras:
+        raise FormatoInvalido("La hoja está vacía.")
+
+    for n, fila in enumerate(primeras[:FILAS_ENCABEZADO]):
+        posiciones = _buscar_columnas(fila)
+        if posiciones and _muestra_valida(primeras[n + 1:n + 1 + FILAS_MUESTRA], posiciones):
+            return n + 2, posiciones
+
+    posiciones = {c: REQUIRED_COLUMNS[f'{c}_col'] for c in COLUMNAS}
+    if len(primeras[0]) > max(posiciones.values()) and _muestra_valida(primeras[1:], posiciones):
+        return 2, posiciones
+    raise FormatoInvalido(
+        "No se encontraron las columnas de fecha, destino, empresa y hora "
+        "(ni por encabezado ni en las columnas A/D/L/O)."
+    )
+
+
+def prevalidar(datos):
+    """Revisa las primeras filas de cada hoja sin leer el libro completo.
+
+    Devuelve {hoja: (primera fila de datos, posiciones)} de las hojas con formato de
+    despachos; lanza FormatoInvalido si no hay ninguna.
+    """
+    try:
+        wb = openpyxl.load_workbook(io.BytesIO(datos), read_only=True, data_only=True)
+    except Exception as e:
+        raise FormatoInvalido(f"No se pudo abrir el archivo como libro de Excel ({type(e).__name__}).") from e
+    try:
+        disposicion, errores = {}, []
+        for ws in wb.worksheets:
+            try:
+                disposicion[ws.title] = detectar_columnas(ws)
+            except FormatoInvalido as e:
+                errores.append(f"{ws.title}: {e}")
+    finally:
+        wb.close()
+    if not disposicion:
+        raise FormatoInvalido("El archivo no tiene el formato esperado. " + " ".join(errores))
+    return disposicion
+
+
+def leer_excel(datos, hoja=None, disposicion=None):
+    """Lee solo las columnas de despachos de una hoja (la primera por defecto) en modo streaming.
+
+    `disposicion` es (primera fila de datos, posiciones) de detectar_columnas; si no se
+    entrega, se detecta al abrir la hoja. destino y empresa repiten pocos nombres y se
+    acumulan como códigos int en un array más la lista de nombres distintos (quedan como
+    categóricas); fecha y hora mezclan datetime, time, números y texto según quién
+    exportó el libro, así que se guardan tal cual y se interpretan después en bloque.
+    """
+    wb = openpyxl.load_workbook(io.BytesIO(datos), read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0] if hoja is None else wb[hoja]
+        fila_inicio, posiciones = disposicion or detectar_columnas(ws)
+        posiciones = [posiciones[c] for c in COLUMNAS]
+        min_col, max_col = min(posiciones), max(posiciones)
+        # Solo se recorren las columnas entre la primera y la última detectada
+        i_fecha, i_destino, i_empresa, i_hora = (p - min_col for p in posiciones)
+        ancho = max_col - min_col + 1
+
+        fechas, horas = [], []
+        destinos, empresas = array('i'), array('i')
+        nombres_destino, nombres_empresa = {}, {}
+        for fila in ws.iter_rows(min_row=fila_inicio, min_col=min_col + 1, max_col=max_col + 1, values_only=True):
+            if len(fila) < ancho:
+                fila = fila + (None,) * (ancho - len(fila))
+            fechas.append(fila[i_fecha])
+            horas.append(fila[i_hora])
+            destino, empresa = fila[i_destino], fila[i_empresa]
+            destinos.append(-1 if destino is None else nombres_destino.setdefault(destino, len(nombres_destino)))
+            empresas.append(-1 if empresa is None else nombres_empresa.setdefault(empresa, len(nombres_empresa)))
+    finally:
+        wb.close()
+
+    return pd.DataFrame({
+        'fecha': fechas,
+        'destino': _categorica(destinos, nombres_destino),
+        'empresa': _categorica(empresas, nombres_empresa),
+        'hora': horas
+    }, columns=COLUMNAS)
+
+
+def _categorica(codigos, nombres):
+    """Categórica a partir de los códigos acumulados (-1 para celdas vacías) y sus nombres en orden."""
+    return pd.Categorical.from_codes(
+        np.frombuffer(codigos, dtype=np.intc), categories=pd.Index(list(nombres), dtype=object)
+    )
+
+
+def parsear_minutos(serie):
+    """Extrae el minuto del día (0-1439) de celdas con time/datetime, texto "HH:MM[:SS] [AM/PM]" o serial de Excel.
+
+    Los números entre 0 y 24 (celda o texto) son la hora escrita como número, con decimales
+    si traen minutos (8.5 son las 08:30); los menores que 1 son la fracción del día de una
+    celda de solo hora. Los enteros mayores son fechas sin hora. Las celdas que no se
+    pueden interpretar quedan como NaN.
+    """
+    numericos = pd.to_numeric(serie, errors='coerce').where(lambda v: v >= 0)
+    # Seriales de Excel: la parte decimal es la fracción del día
+    minutos = np.floor((numericos % 1) * 1440 + 1e-6)
+    horas = (numericos >= 1) & (numericos < 24)
+    minutos = minutos.where(~horas, np.floor(numericos * 60 + 1e-6))
+    minutos = minutos.where((numericos != np.floor(numericos)) | (numericos < 24))
+
+    # time, datetime y texto comparten la representación "... HH:MM[:SS]"
+    texto = serie[numericos.isna()].astype(str).str.extract(
+        r'(\d{1,2}):(\d{2})(?::\d{2}(?:\.\d+)?)?\s*(?:([AaPp])\.?\s*[Mm]\b\.?)?'
+    )
+    hh, mm = (pd.to_numeric(texto[i], errors='coerce') for i in (0, 1))
+    # 12 AM es medianoche y 12 PM mediodía; una hora de 24 horas con AM/PM se descarta
+    meridiano = texto[2].str.upper()
+    en_12_horas = (hh % 12 + (meridiano == 'P') * 12).where(hh.between(1, 12))
+    hh = hh.where(meridiano.isna(), en_12_horas)
+    minutos.loc[texto.index] = (hh * 60 + mm).where(mm < 60)
+    return minutos.where((minutos >= 0) & (minutos < 1440))
+
+
+def parsear_horas(serie):
+    """Hora (0-23) de cada celda según parsear_minutos; NaN si no se puede interpretar."""
+    return np.floor(parsear_minutos(serie) / 60)
+
+
+def limpiar_datos(df):
+    """Descarta filas incompletas y normaliza fechas, horas y empresas."""
+    df = df.dropna(subset=COLUMNAS).copy()
+
+    df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce', dayfirst=True)
+    minutos = parsear_minutos(df['hora'])
+    df['hora'], df['minuto'] = minutos // 60, minutos % 60
+    df['empresa'] = normalizar_serie(df['empresa'], aproximado=APROXIMADO)
+    return compactar(df)
+
+
+def compactar(df):
+    """Deja solo las columnas del reporte con tipos compactos.
+
+    fecha queda en resolución de día, hora (y minuto, si está) en uint8 y empresa/destino
+    como categóricas: cada nombre se guarda una vez y las filas solo llevan un código.
+    """
+    origen = [c for c in COLUMNAS_ORIGEN if c in df.columns]
+    df = df.dropna(subset=['fecha', 'hora'])
+    return pd.DataFrame({
+        'fecha': df['fecha'].dt.normalize().astype('datetime64[s]'),
+        'destino': df['destino'].astype(str).astype('category'),
+        'empresa': df['empresa'].astype('category').cat.remove_unused_categories(),
+        'hora': df['hora'].astype(np.uint8),
+        **({'minuto': df['minuto'].astype(np.uint8)} if 'minuto' in df.columns else {}),
+        **{c: df[c].astype(str).astype('category') for c in origen}
+    }).reset_index(drop=True)
+
+
+def _ruta_sidecar(clave):
+    if not CACHE_DIR:
+        return None
+    # La normalización aproximada cambia las empresas: cada modo tiene su archivo
+    modo = "aprox" if APROXIMADO else "exacto"
+    return Path(CACHE_DIR) / f"{clave}.v{VERSION_SIDECAR}.{modo}.parquet"
+
+
+def _avisar_sidecar(accion, error):
+    """Informa una sola vez por proceso que los Parquet auxiliares no funcionan."""
+    global _aviso_sidecar
+    if not _aviso_sidecar:
+        _aviso_sidecar = True
+        _log.warning(
+            "No se pudo %s un Parquet auxiliar en %s (%s: %s); los libros se vuelven a leer del Excel.",
+            accion, CACHE_DIR, type(error).__name__, error
+        )
+
+
+def _leer_sidecar(clave):
+    ruta = _ruta_sidecar(clave)
+    if ruta is None or not ruta.exists():
+        return None
+    try:
+        df = pd.read_parquet(ruta)
+    except Exception as e:
+        # Sin pyarrow o archivo corrupto: se vuelve a parsear el Excel
+        _avisar_sidecar("leer", e)
+        return None
+    # Parquet no guarda resolución de segundos y devuelve la fecha en milisegundos
+    df['fecha'] = df['fecha'].astype('datetime64[s]')
+    return df
+
+
+def _escribir_sidecar(clave, df):
+    ruta = _ruta_sidecar(clave)
+    if ruta is None:
+        return
+    try:
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = ruta.with_suffix(".tmp")
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, ruta)
+    except Exception as e:
+        _avisar_sidecar("escribir", e)
+
+
+def tamano_dataframe(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def _pool_lectura():
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            # forkserver: el servidor de Streamlit tiene hilos vivos y no es seguro hacerle fork
+            _pool = ProcessPoolExecutor(
+                max_workers=MAX_PROCESOS_LECTURA, mp_context=multiprocessing.get_context("forkserver")
+            )
+        return _pool
+
+
+def _descartar_pool(pool):
+    global _pool
+    with _lock_pool:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _en_pool(funcion, argumentos):
+    """Ejecuta funcion(*args) para cada tupla en el pool de lectura, en orden.
+
+    Si un proceso murió (BrokenProcessPool), el pool se recrea y se reintenta una vez.
+    """
+    for intento in range(2):
+        pool = _pool_lectura()
+        try:
+            return list(pool.map(funcion, *zip(*argumentos)))
+        except BrokenProcessPool:
+            _descartar_pool(pool)
+            if intento:
+                raise
+
+
+def _leer_hoja(datos, hoja, disposicion):
+    crudo = leer_excel(datos, hoja, disposicion)
+    return limpiar_datos(crudo).assign(hoja=hoja), tamano_dataframe(crudo)
+
+
+def _leer_libros(libros):
+    """Lee {clave: bytes} usando los Parquet auxiliares; devuelve ({clave: DataFrame limpio}, {clave: error}).
+
+    Cada (libro, hoja) pendiente es una unidad del pool de procesos, así varios libros de
+    una hoja también se leen en paralelo. La prevalidación rechaza un libro sin hojas
+    válidas antes de recorrerlo completo, sin descartar los demás.
+    """
+    frames = {clave: _leer_sidecar(clave) for clave in libros}
+    pendientes, errores = {}, {}
+    for clave, datos in libros.items():
+        if frames[clave] is None:
+            try:
+                pendientes[clave] = prevalidar(datos)
+            except FormatoInvalido as e:
+                errores[clave] = str(e)
+    unidades = [(clave, hoja, d) for clave, hojas in pendientes.items() for hoja, d in hojas.items()]
+    leidas = []
+    if len(unidades) == 1:
+        leidas = [_leer_hoja(libros[unidades[0][0]], *unidades[0][1:])]
+    elif unidades:
+        leidas = _en_pool(_leer_hoja, [(libros[clave], hoja, d) for clave, hoja, d in unidades])
+
+    for clave in pendientes:
+        propias = [r for (c, _, _), r in zip(unidades, leidas) if c == clave]
+        df = compactar(pd.concat([d for d, _ in propias], ignore_index=True))
+        # Huella de los datos sin compactar, para informar el ahorro
+        df.attrs['bytes_crudos'] = sum(n for _, n in propias)
+        _escribir_sidecar(clave, df)
+        frames[clave] = df
+    return frames, errores
+
+
+def identificar_libros(subidos):
+    """Arma {(nombre, clave): bytes} a partir de tuplas (nombre, clave, bytes).
+
+    `clave` es hash_contenido(bytes), calculada una sola vez por quien sube los archivos.
+    Dos libros distintos con el mismo nombre se conservan ambos (el segundo queda como
+    "nombre (2)"); el mismo libro subido dos veces se lee una sola vez.
+    """
+    libros, nombres, vistos = {}, set(), set()
+    for nombre, clave, datos in subidos:
+        if (nombre, clave) in vistos:
+            continue
+        vistos.add((nombre, clave))
+        unico, n = nombre, 2
+        while unico in nombres:
+            unico, n = f"{nombre} ({n})", n + 1
+        nombres.add(unico)
+        libros[(unico, clave)] = datos
+    return libros
+
+
+def clave_conjunto(libros):
+    """Identifica un conjunto de libros {(nombre, clave): bytes} por nombre y contenido."""
+    return hash_contenido(repr(sorted(libros)).encode())
+
+
+def _combinar(libros):
+    frames, errores = _leer_libros({clave: datos for (_, clave), datos in libros.items()})
+    rechazados = {nombre: errores[clave] for nombre, clave in libros if clave in errores}
+    if len(rechazados) == len(libros):
+        raise FormatoInvalido(" ".join(f"{nombre}: {error}" for nombre, error in rechazados.items()))
+    partes = [frames[clave].assign(archivo=nombre) for nombre, clave in libros if clave not in errores]
+    df = compactar(pd.concat(partes, ignore_index=True))
+    df.attrs['bytes_crudos'] = sum(f.attrs.get('bytes_crudos', 0) for f in frames.values() if f is not None)
+    df.attrs['rechazados'] = rechazados
+    return df
+
+
+def cargar_excels(libros):
+    """Combina varios libros {(nombre, clave): bytes} en un DataFrame con columnas `archivo` y `hoja`.
+
+    Todas las hojas de todos los libros se leen en paralelo. Solo el DataFrame combinado
+    queda en la cache compartida (los libros sueltos se reutilizan desde sus Parquet
+    auxiliares); las filas de un libro son `df[df['archivo'] == nombre]`. Los libros sin
+    el formato de despachos se omiten y quedan en `df.attrs['rechazados']` ({nombre:
+    motivo}); si ninguno sirve se lanza FormatoInvalido con el motivo de cada archivo.
+    """
+    if not libros:
+        return pd.DataFrame(columns=COLUMNAS + ['minuto'] + COLUMNAS_ORIGEN)
+    return cache_datos.obtener(('conjunto', clave_conjunto(libros)), lambda: _combinar(libros), tamano_dataframe)
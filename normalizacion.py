@@ -0,0 +1,107 @@
+import difflib
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+EQUIVALENCIAS = {
+    # JORQUERA TRANSPORTE S. A.
+    "JORQUERA TRANSPORTE S A": "JORQUERA TRANSPORTE S. A.",
+    # M S & D SPA y variantes
+    "MINING SERVICES AND DERIVATES": "M S & D SPA",
+    "MINING SERVICES AND DERIVATES SPA": "M S & D SPA",
+    "M S AND D": "M S & D SPA",
+    "M S AND D SPA": "M S & D SPA",
+    "MSANDD SPA": "M S & D SPA",
+    "M S D": "M S & D SPA",
+    "M S D SPA": "M S & D SPA",
+    "M S & D": "M S & D SPA",
+    "M S & D SPA": "M S & D SPA",
+    "MS&D SPA": "M S & D SPA",
+    "MSD SPA": "M S & D SPA",
+    # M&Q SPA y variantes
+    "M AND Q SPA": "M&Q SPA",
+    "M AND Q": "M&Q SPA",
+    "M Q SPA": "M&Q SPA",
+    "MQ SPA": "M&Q SPA",
+    "M&Q SPA": "M&Q SPA",
+    "MANDQ SPA": "M&Q SPA",
+    "MINING AND QUARRYING SPA": "M&Q SPA",
+    "MINING AND QUARRYNG SPA": "M&Q SPA",
+    # AG SERVICES SPA
+    "AG SERVICE SPA": "AG SERVICES SPA",
+    "AG SERVICES SPA": "AG SERVICES SPA",
+    # COSEDUCAM S A
+    "COSEDUCAM S A": "COSEDUCAM S A"
+}
+
+# Similitud mínima para aceptar una variante no registrada (0-1)
+UMBRAL_APROXIMADO = 0.9
+
+# La búsqueda aproximada es opcional y está apagada por defecto: un error mueve
+# despachos de una empresa a otra en los reportes que reciben
+APROXIMADO = os.environ.get("INFORME_EMPRESAS_APROXIMADAS", "").strip().lower() in ("1", "si", "sí", "true")
+
+# Nombres con un núcleo (sin la razón social) más corto que esto, o con siglas de
+# una o dos letras, nunca se aproximan: "M AND S" y "M AND Q" son empresas distintas
+LARGO_MINIMO_APROXIMADO = 8
+RAZONES_SOCIALES = {"SPA", "SA", "S", "A", "LTDA", "EIRL", "CIA"}
+
+
+def _limpiar(nombre):
+    nombre = str(nombre).strip().upper()
+    nombre = nombre.replace('.', '').replace('&', 'AND')
+    nombre = ' '.join(nombre.split())  # Normaliza espacios múltiples
+    # "S.A." y "S A" son la misma razón social
+    return nombre[:-4] + " SA" if nombre.endswith(" S A") else nombre
+
+
+# Índice de alias precompilado: las claves pasan por la misma limpieza que los datos
+_INDICE_ALIAS = {_limpiar(alias): canonico for alias, canonico in EQUIVALENCIAS.items()}
+_ALIAS = list(_INDICE_ALIAS)
+
+
+def _admite_aproximacion(nombre):
+    nucleo = [t for t in nombre.split() if t not in RAZONES_SOCIALES and t != "AND"]
+    return (
+        len("".join(nucleo)) >= LARGO_MINIMO_APROXIMADO
+        and all(len(t) > 2 for t in nucleo)
+    )
+
+
+@lru_cache(maxsize=1024)
+def _aproximar(nombre):
+    if not _admite_aproximacion(nombre):
+        return nombre
+    coincidencias = difflib.get_close_matches(nombre, _ALIAS, n=1, cutoff=UMBRAL_APROXIMADO)
+    return _INDICE_ALIAS[coincidencias[0]] if coincidencias else nombre
+
+
+# Función robusta para normalizar nombres de empresa
+def normalizar_nombre_empresa(nombre, aproximado=False):
+    nombre = _limpiar(nombre)
+    if nombre in _INDICE_ALIAS:
+        return _INDICE_ALIAS[nombre]
+    return _aproximar(nombre) if aproximado else nombre
+
+
+def normalizar_serie(serie, aproximado=False):
+    """Normaliza una columna de empresas procesando solo sus valores únicos.
+
+    Devuelve una serie categórica; el costo depende del número de nombres distintos,
+    no del número de filas.
+    """
+    categorica = serie.astype('category')
+    if len(categorica.cat.categories) == 0:
+        return categorica
+    normalizados = [normalizar_nombre_empresa(c, aproximado) for c in categorica.cat.categories]
+    categorias, inversa = np.unique(np.array(normalizados, dtype=object), return_inverse=True)
+
+    codigos = categorica.cat.codes.to_numpy()
+    codigos = np.where(codigos >= 0, inversa[codigos], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(codigos, categories=categorias),
+        index=serie.index,
+        name=serie.name
+    )
@@ -0,0 +1,80 @@
+import io
+from functools import lru_cache
+from pathlib import Path
+
+from PIL import Image
+
+STATIC_DIR = Path(__file__).parent / "static"
+ARCHIVOS_LOGOS = {
+    "COSEDUCAM S A": "coseducam.png",
+    "M&Q SPA": "mq.png",
+    "M S & D SPA": "msd.png",
+    "JORQUERA TRANSPORTE S. A.": "jorquera.png",
+    "AG SERVICES SPA": "ag.png"
+}
+ARCHIVO_BANNER = "image.png"
+
+ANCHO_LOGO = 120
+ANCHO_FRANJA = 900
+
+
+def _abrir(nombre):
+    ruta = STATIC_DIR / nombre
+    if not ruta.exists():
+        return None
+    with Image.open(ruta) as img:
+        img.load()
+        return img
+
+
+def _a_ancho(img, ancho):
+    if img.width == ancho:
+        return img
+    alto = int(img.height * (ancho / float(img.width)))
+    return img.resize((ancho, alto), Image.LANCZOS)
+
+
+def _sobre_blanco(img):
+    if img.mode != 'RGBA':
+        return img.convert('RGB')
+    fondo = Image.new('RGB', img.size, (255, 255, 255))
+    fondo.paste(img, (0, 0), img)
+    return fondo
+
+
+def _png(img):
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class Recursos:
+    """Banner y logos decodificados una vez, con las variantes que usan el dashboard y el PDF."""
+
+    def __init__(self, ancho_base):
+        self.ancho_base = ancho_base
+        self.banner_png = None
+        self.banner_pdf = None
+        self.logos_png = {}
+        self.franjas_logo = {}
+
+        banner = _abrir(ARCHIVO_BANNER)
+        if banner is not None:
+            self.banner_png = _png(banner)
+            self.banner_pdf = _a_ancho(_sobre_blanco(banner), ancho_base)
+
+        for empresa, archivo in ARCHIVOS_LOGOS.items():
+            logo = _abrir(archivo)
+            if logo is None:
+                continue
+            logo = _a_ancho(logo.convert('RGBA'), ANCHO_LOGO)
+            self.logos_png[empresa] = _png(logo)
+
+            franja = Image.new('RGBA', (ANCHO_FRANJA, logo.height), (255, 255, 255, 0))
+            franja.paste(logo, ((ANCHO_FRANJA - ANCHO_LOGO)//2, 0), logo)
+            self.franjas_logo[empresa] = _a_ancho(_sobre_blanco(franja), ancho_base)
+
+
+@lru_cache(maxsize=None)
+def obtener_recursos(ancho_base):
+    return Recursos(ancho_base)
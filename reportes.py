@@ -0,0 +1,304 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from PIL import Image
+from fpdf import FPDF
+
+from agregacion import horas_labels
+from cache import CacheLRU
+from recursos import obtener_recursos
+from tabla_pdf import escribir_tabla
+
+COLOR_PALETTE = px.colors.qualitative.Plotly
+
+# Parámetros de rasterización del gráfico para el PDF
+ANCHO_GRAFICO, ALTO_GRAFICO, ESCALA_GRAFICO = 900, 400, 2
+
+# PNGs ya rasterizados por kaleido, acotados por tamaño total
+_cache_graficos = CacheLRU(max_entradas=256, max_bytes=64 * 1024 * 1024)
+
+MAX_NOMBRE_ARCHIVO = 120
+
+# Procesos para generar PDFs en paralelo (por defecto, uno por CPU)
+MAX_PROCESOS_PDF = int(os.environ.get("INFORME_PROCESOS_PDF", 0)) or None
+
+
+def nombre_archivo(empresa, usados=None):
+    """Nombre "dashboard_<empresa>.pdf" seguro para el disco y para un ZIP.
+
+    Las empresas vienen de los datos: se quitan separadores de ruta y caracteres que
+    Windows no admite. Con `usados` (set) un nombre repetido recibe el sufijo " (2)".
+    """
+    base = ' '.join(re.sub(r'[<>:"/\\|?*\x00-\x1f]', ' ', str(empresa)).split())
+    base = base[:MAX_NOMBRE_ARCHIVO].strip(' .') or "Empresa"
+    nombre, n = f"dashboard_{base}.pdf", 2
+    if usados is not None:
+        while nombre.lower() in usados:
+            nombre, n = f"dashboard_{base} ({n}).pdf", n + 1
+        usados.add(nombre.lower())
+    return nombre
+
+
+def grafico_empresa(resumen, empresa):
+    """Gráfico de líneas de equipos por hora y destino de una empresa."""
+    destinos_unicos = resumen['destino'].unique()
+    color_map = {dest: COLOR_PALETTE[i % len(COLOR_PALETTE)] for i, dest in enumerate(destinos_unicos)}
+    fig = px.line(
+        resumen,
+        x='hora',
+        y="Cantidad",
+        color='destino',
+        markers=True,
+        labels={
+            'hora': "Hora de Entrada",
+            "Cantidad": "Cantidad de Equipos",
+            'destino': "Destino"
+        },
+        color_discrete_map=color_map
+    )
+    fig.update_layout(xaxis=dict(dtick=1), title=f"Cantidad de equipos por hora - {empresa}")
+    return fig
+
+
+def grafico_calor_horas(fechas, matriz):
+    """Mapa de calor hora × día de la cantidad de equipos."""
+    fig = go.Figure(go.Heatmap(
+        x=fechas,
+        y=horas_labels,
+        z=matriz.T,
+        colorscale="YlOrRd",
+        colorbar=dict(title="Equipos"),
+        hovertemplate="%{x}<br>%{y}<br>Equipos: %{z}<extra></extra>"
+    ))
+    fig.update_layout(title="Equipos por hora y día", xaxis_title="Fecha", yaxis_title="Hora de Entrada",
+                      yaxis=dict(autorange="reversed"))
+    return fig
+
+
+def grafico_totales_diarios(totales):
+    """Total diario de equipos por empresa (trazas WebGL)."""
+    fig = go.Figure()
+    for i, empresa in enumerate(totales.columns):
+        fig.add_trace(go.Scattergl(
+            x=totales.index,
+            y=totales[empresa],
+            mode="lines+markers",
+            name=str(empresa),
+            line=dict(color=COLOR_PALETTE[i % len(COLOR_PALETTE)])
+        ))
+    fig.update_layout(title="Total diario de equipos por empresa", xaxis_title="Fecha",
+                      yaxis_title="Cantidad de Equipos")
+    return fig
+
+
+def _clave_grafico(resumen, empresa):
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(resumen, index=False).to_numpy().tobytes())
+    h.update(repr((list(resumen.columns), empresa, ANCHO_GRAFICO, ALTO_GRAFICO, ESCALA_GRAFICO)).encode())
+    return h.hexdigest()
+
+
+def _rasterizar(resumen, empresa):
+    return grafico_empresa(resumen, empresa).to_image(
+        format="png", width=ANCHO_GRAFICO, height=ALTO_GRAFICO, scale=ESCALA_GRAFICO
+    )
+
+
+def rasterizar_grafico(resumen, empresa):
+    """PNG del gráfico de la empresa; reutiliza la imagen si los datos y parámetros no cambiaron."""
+    clave = _clave_grafico(resumen, empresa)
+    png = _cache_graficos.get(clave)
+    if png is None:
+        png = _rasterizar(resumen, empresa)
+        _cache_graficos.put(clave, png, len(png))
+    return png
+
+
+def estadisticas_cache_graficos():
+    return _cache_graficos.estadisticas()
+
+
+def _componer_imagen(empresa, png_grafico):
+    """Apila banner, logo y gráfico en una sola imagen del ancho del gráfico."""
+    recursos = obtener_recursos(ANCHO_GRAFICO * ESCALA_GRAFICO)
+    images_to_stack = []
+
+    if recursos.banner_pdf is not None:
+        images_to_stack.append(recursos.banner_pdf)
+    if empresa in recursos.franjas_logo:
+        images_to_stack.append(recursos.franjas_logo[empresa])
+    if png_grafico:
+        grafico_img = Image.open(io.BytesIO(png_grafico))
+        if grafico_img.width != recursos.ancho_base:
+            wpercent = (recursos.ancho_base / float(grafico_img.size[0]))
+            hsize = int((float(grafico_img.size[1]) * float(wpercent)))
+            grafico_img = grafico_img.resize((recursos.ancho_base, hsize), Image.LANCZOS)
+        images_to_stack.append(grafico_img)
+    if not images_to_stack:
+        return None
+
+    total_height = sum(img.height for img in images_to_stack)
+    combined_img = Image.new('RGB', (recursos.ancho_base, total_height), (255, 255, 255))
+    y_offset = 0
+    for img in images_to_stack:
+        combined_img.paste(img, (0, y_offset))
+        y_offset += img.height
+    return combined_img
+
+
+def generar_pdf_empresa(empresa, resumen, tabla_final, png_grafico=None):
+    """Genera el PDF (gráfico + tabla hora × destino) de una empresa y devuelve sus bytes."""
+    if png_grafico is None and not resumen.empty:
+        png_grafico = rasterizar_grafico(resumen, empresa)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pdf = FPDF(orientation='L', unit='mm', format='A4')
+        pdf.add_page()
+        pdf.set_font("Arial", "B", 16)
+        pdf.cell(0, 10, f"Empresa: {empresa}", ln=1, align="C")
+        pdf.ln(5)
+
+        combined_img = _componer_imagen(empresa, png_grafico)
+        if combined_img is not None:
+            combined_path = os.path.join(tmpdir, "combinado.png")
+            combined_img.save(combined_path)
+            pdf.image(combined_path, x=10, y=20, w=270)
+
+        pdf.add_page(orientation='P')
+        pdf.set_font("Arial", "B", 12)
+        pdf.cell(0, 10, "Tabla de equipos por hora y destino", ln=1, align="C")
+        escribir_tabla(pdf, tabla_final)
+
+        pdf_path = os.path.join(tmpdir, "dashboard.pdf")
+        pdf.output(pdf_path)
+        with open(pdf_path, "rb") as f:
+            return f.read()
+
+
+def _generar_pdf_trabajo(args):
+    clave, empresa, resumen, tabla_final, png_grafico = args
+    if png_grafico is None and not resumen.empty:
+        png_grafico = _rasterizar(resumen, empresa)
+    return clave, generar_pdf_empresa(empresa, resumen, tabla_final, png_grafico), png_grafico
+
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def _pool_pdf(max_procesos=None):
+    """Pool de procesos persistente: cada proceso importa plotly/PIL/fpdf y arranca kaleido una vez.
+
+    `max_procesos` solo cuenta al crear el pool; los procesos se inician a medida que hay trabajo.
+    """
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            # forkserver: se llama desde hilos del servidor de Streamlit, y hacer fork de un
+            # proceso con hilos vivos puede dejar locks tomados en el hijo
+            _pool = ProcessPoolExecutor(
+                max_workers=max_procesos or MAX_PROCESOS_PDF, mp_context=multiprocessing.get_context("forkserver")
+            )
+        return _pool
+
+
+def _descartar_pool(pool):
+    global _pool
+    with _lock_pool:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _enviar(argumentos, max_procesos):
+    """Envía los trabajos al pool; si quedó roto por una llamada anterior, lo recrea."""
+    pool = _pool_pdf(max_procesos)
+    try:
+        return pool, {pool.submit(_generar_pdf_trabajo, args): args for args in argumentos}
+    except BrokenProcessPool:
+        _descartar_pool(pool)
+        pool = _pool_pdf(max_procesos)
+        return pool, {pool.submit(_generar_pdf_trabajo, args): args for args in argumentos}
+
+
+def generar_pdfs(trabajos, max_procesos=None):
+    """Genera PDFs en paralelo en el pool persistente y los entrega a medida que terminan.
+
+    `trabajos` mapea una clave cualquiera -> (empresa, resumen, tabla_final); cada
+    proceso recibe solo los datos agregados de su reporte. Produce tríos (clave, bytes,
+    error): un reporte que falla (por ejemplo, kaleido sin Chrome) entrega bytes None y
+    el mensaje del error, sin detener los demás.
+    """
+    # El cache de gráficos vive en este proceso: se consulta antes de repartir
+    # el trabajo y se completa con los PNG que devuelven los procesos
+    argumentos = []
+    claves_grafico = {}
+    for clave, (empresa, resumen, tabla) in trabajos.items():
+        png_grafico = None
+        if not resumen.empty:
+            claves_grafico[clave] = _clave_grafico(resumen, empresa)
+            png_grafico = _cache_graficos.get(claves_grafico[clave])
+        argumentos.append((clave, empresa, resumen, tabla, png_grafico))
+    if not argumentos:
+        return
+
+    pendientes = argumentos
+    for intento in range(2):
+        pool, futuros = _enviar(pendientes, max_procesos)
+        rotos = []
+        for futuro in as_completed(futuros):
+            args = futuros[futuro]
+            try:
+                clave, pdf_bytes, png_grafico = futuro.result()
+            except Exception as e:
+                # Si murió un proceso, sus trabajos se reintentan una vez en un pool nuevo
+                if isinstance(e, BrokenProcessPool) and not intento:
+                    rotos.append(args)
+                else:
+                    yield args[0], None, f"{type(e).__name__}: {e}"
+                continue
+            if png_grafico is not None:
+                _cache_graficos.put(claves_grafico[clave], png_grafico, len(png_grafico))
+            yield clave, pdf_bytes, None
+        if not rotos:
+            return
+        _descartar_pool(pool)
+        pendientes = rotos
+
+
+def generar_zip_reportes(reportes, max_procesos=None, avance=None):
+    """Genera en paralelo los PDFs de varias empresas y los devuelve en un ZIP.
+
+    `reportes` mapea empresa -> (resumen, tabla_final); `avance(fraccion)` se llama
+    cada vez que termina un PDF. Las empresas cuyo PDF falló se listan en errores.txt
+    dentro del ZIP; si fallan todas, se lanza RuntimeError.
+    """
+    trabajos = {empresa: (empresa, resumen, tabla) for empresa, (resumen, tabla) in reportes.items()}
+    usados = set()
+    nombres = {empresa: nombre_archivo(empresa, usados) for empresa in trabajos}
+    errores = {}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for n, (empresa, pdf_bytes, error) in enumerate(generar_pdfs(trabajos, max_procesos), start=1):
+            if error:
+                errores[empresa] = error
+            else:
+                zf.writestr(nombres[empresa], pdf_bytes)
+            if avance:
+                avance(n / len(trabajos))
+        if errores:
+            zf.writestr("errores.txt", "\n".join(f"{empresa}: {error}" for empresa, error in errores.items()))
+    if trabajos and len(errores) == len(trabajos):
+        raise RuntimeError(f"No se pudo generar ningún PDF. {next(iter(errores.values()))}")
+    return buffer.getvalue()
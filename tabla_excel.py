@@ -0,0 +1,103 @@
+import io
+import re
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+MAX_NOMBRE_HOJA = 31
+ANCHO_HORA = 16
+ANCHO_MIN_COLUMNA = 10
+ANCHO_MAX_COLUMNA = 28
+
+_NEGRITA = Font(bold=True)
+_FONDO_ENCABEZADO = PatternFill("solid", fgColor="E6E6E6")
+
+
+def _nombre_hoja(empresa, usados):
+    """Nombre de hoja válido para Excel (sin []:*?/\\, hasta 31 caracteres) y sin repetir."""
+    base = re.sub(r'[\[\]:*?/\\]', ' ', str(empresa)).strip()[:MAX_NOMBRE_HOJA] or "Empresa"
+    nombre, n = base, 2
+    while nombre.lower() in usados:
+        sufijo = f" ({n})"
+        nombre, n = base[:MAX_NOMBRE_HOJA - len(sufijo)] + sufijo, n + 1
+    usados.add(nombre.lower())
+    return nombre
+
+
+def _celda(ws, valor, negrita=False, fondo=False):
+    celda = WriteOnlyCell(ws, value=valor)
+    if negrita:
+        celda.font = _NEGRITA
+    if fondo:
+        celda.fill = _FONDO_ENCABEZADO
+    return celda
+
+
+def _escribir_empresa(ws, tabla_final):
+    destinos = [str(c) for c in tabla_final.columns]
+    ws.column_dimensions['A'].width = ANCHO_HORA
+    ws.freeze_panes = 'B2'
+    for i, destino in enumerate(destinos, start=2):
+        ancho = min(ANCHO_MAX_COLUMNA, max(ANCHO_MIN_COLUMNA, len(destino) + 2))
+        ws.column_dimensions[get_column_letter(i)].width = ancho
+
+    ws.append([_celda(ws, "Hora", True, True)] + [_celda(ws, d, True, True) for d in destinos])
+    valores = tabla_final.to_numpy(dtype=np.int64).tolist()
+    for etiqueta, fila in zip(tabla_final.index, valores):
+        if etiqueta == "TOTAL":
+            ws.append([_celda(ws, "TOTAL", True)] + [_celda(ws, v, True) for v in fila])
+        else:
+            ws.append([str(etiqueta)] + fila)
+
+
+def _fila_resumen(empresa, hoja, tabla_final):
+    horas = tabla_final.drop(index="TOTAL", errors='ignore')
+    por_hora = horas.to_numpy(dtype=np.int64).sum(axis=1)
+    total = int(por_hora.sum())
+    pico = int(np.argmax(por_hora)) if total else None
+    return [
+        empresa,
+        hoja,
+        total,
+        int((horas.to_numpy().sum(axis=0) > 0).sum()),
+        str(horas.index[pico]) if pico is not None else "",
+        int(por_hora[pico]) if pico is not None else 0
+    ]
+
+
+def generar_excel_empresas(tablas, titulo=None, avance=None):
+    """Escribe en un .xlsx una hoja "Resumen" y una hoja por empresa con su tabla hora × destino.
+
+    `tablas` mapea empresa -> tabla_final (con la fila TOTAL). Se usa el modo write-only de
+    openpyxl, que escribe las filas a medida que se agregan sin mantener el libro en memoria.
+    `avance(fraccion)` se llama al terminar cada hoja.
+    """
+    wb = Workbook(write_only=True)
+    usados = {"resumen"}
+    hojas = {empresa: _nombre_hoja(empresa, usados) for empresa in tablas}
+
+    # En modo write-only las hojas se escriben en orden: el resumen va primero
+    resumen = wb.create_sheet("Resumen")
+    for letra, ancho in zip("ABCDEF", (32, 32, 14, 10, 16, 14)):
+        resumen.column_dimensions[letra].width = ancho
+    if titulo:
+        resumen.append([_celda(resumen, titulo, True)])
+        resumen.append([])
+    encabezado = ["Empresa", "Hoja", "Total equipos", "Destinos", "Hora peak", "Equipos en peak"]
+    resumen.append([_celda(resumen, c, True, True) for c in encabezado])
+    filas = [_fila_resumen(empresa, hojas[empresa], tabla) for empresa, tabla in tablas.items()]
+    for fila in filas:
+        resumen.append(fila)
+    resumen.append([_celda(resumen, "TOTAL", True), None, _celda(resumen, sum(f[2] for f in filas), True)])
+
+    for n, (empresa, tabla) in enumerate(tablas.items(), start=1):
+        _escribir_empresa(wb.create_sheet(hojas[empresa]), tabla)
+        if avance:
+            avance(n / len(tablas))
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,111 @@
+import numpy as np
+
+ALTO_FILA = 6
+ALTO_LINEA_ENCABEZADO = 4
+MAX_LINEAS_ENCABEZADO = 3
+ANCHO_HORA = 26
+ANCHO_MIN_COLUMNA = 14
+ANCHO_MAX_COLUMNA = 30
+
+
+def _latin1(texto):
+    # Las fuentes estándar de FPDF solo admiten latin-1
+    return str(texto).encode('latin-1', 'replace').decode('latin-1')
+
+
+def _partir_texto(pdf, texto, ancho):
+    """Divide el texto en líneas que caben en `ancho` (máximo MAX_LINEAS_ENCABEZADO)."""
+    lineas, actual = [], ""
+    for palabra in _latin1(texto).split():
+        candidata = f"{actual} {palabra}".strip()
+        if pdf.get_string_width(candidata) <= ancho or not actual:
+            actual = candidata
+        else:
+            lineas.append(actual)
+            actual = palabra
+    lineas.append(actual)
+    if len(lineas) > MAX_LINEAS_ENCABEZADO:
+        lineas = lineas[:MAX_LINEAS_ENCABEZADO]
+        lineas[-1] += ".."
+    # Palabras más anchas que la columna se recortan
+    return [l if pdf.get_string_width(l) <= ancho else _recortar(pdf, l, ancho) for l in lineas]
+
+
+def _recortar(pdf, texto, ancho):
+    while texto and pdf.get_string_width(texto + "..") > ancho:
+        texto = texto[:-1]
+    return texto + ".."
+
+
+def _grupos_columnas(n_columnas, ancho_util):
+    """Reparte las columnas en grupos que caben en el ancho de la página."""
+    por_pagina = max(1, int((ancho_util - ANCHO_HORA) // ANCHO_MIN_COLUMNA))
+    n_grupos = max(1, -(-n_columnas // por_pagina))
+    # Grupos de tamaño parejo en vez de uno lleno y otro casi vacío
+    return np.array_split(np.arange(n_columnas), n_grupos) if n_columnas else [np.arange(0)]
+
+
+def _escribir_encabezado(pdf, columnas, ancho_col):
+    pdf.set_font("Arial", "B", 7)
+    lineas = [_partir_texto(pdf, c, ancho_col - 1) for c in columnas]
+    alto = ALTO_LINEA_ENCABEZADO * max([1] + [len(l) for l in lineas]) + 2
+
+    x, y = pdf.l_margin, pdf.get_y()
+    pdf.set_fill_color(230, 230, 230)
+    pdf.rect(x, y, ANCHO_HORA, alto, 'DF')
+    pdf.set_xy(x, y + (alto - ALTO_LINEA_ENCABEZADO) / 2)
+    pdf.cell(ANCHO_HORA, ALTO_LINEA_ENCABEZADO, "Hora", align="C")
+    x += ANCHO_HORA
+    for texto in lineas:
+        pdf.rect(x, y, ancho_col, alto, 'DF')
+        y_texto = y + (alto - ALTO_LINEA_ENCABEZADO * len(texto)) / 2
+        for i, linea in enumerate(texto):
+            pdf.set_xy(x, y_texto + i * ALTO_LINEA_ENCABEZADO)
+            pdf.cell(ancho_col, ALTO_LINEA_ENCABEZADO, linea, align="C")
+        x += ancho_col
+    pdf.set_xy(pdf.l_margin, y + alto)
+    pdf.set_font("Arial", "", 8)
+
+
+def escribir_tabla(pdf, tabla_final, orientacion='P'):
+    """Escribe la tabla hora × destino (con la fila TOTAL) en la página actual del PDF.
+
+    Si los destinos no caben a lo ancho, la tabla se divide en grupos de columnas, cada
+    uno en su propia página; el encabezado se repite en cada salto de página.
+    """
+    etiquetas = [_latin1(e) for e in tabla_final.index]
+    columnas = [_latin1(c) for c in tabla_final.columns]
+    celdas = tabla_final.to_numpy(dtype=np.int64).astype(str)
+
+    ancho_util = pdf.w - pdf.l_margin - pdf.r_margin
+    grupos = _grupos_columnas(len(columnas), ancho_util)
+    auto_salto = pdf.auto_page_break
+    pdf.set_auto_page_break(False, pdf.b_margin)
+
+    for n, grupo in enumerate(grupos):
+        if n > 0:
+            pdf.add_page(orientation=orientacion)
+        if len(grupos) > 1:
+            pdf.set_font("Arial", "I", 8)
+            pdf.cell(0, 5, f"Destinos {grupo[0] + 1}-{grupo[-1] + 1} de {len(columnas)}", ln=1)
+
+        ancho_col = min(ANCHO_MAX_COLUMNA, (ancho_util - ANCHO_HORA) / max(1, len(grupo)))
+        nombres = [columnas[i] for i in grupo]
+        bloque = celdas[:, grupo]
+        _escribir_encabezado(pdf, nombres, ancho_col)
+
+        for etiqueta, fila in zip(etiquetas, bloque):
+            if pdf.get_y() + ALTO_FILA > pdf.page_break_trigger:
+                pdf.add_page(orientation=orientacion)
+                _escribir_encabezado(pdf, nombres, ancho_col)
+            negrita = etiqueta == "TOTAL"
+            if negrita:
+                pdf.set_font("Arial", "B", 8)
+            pdf.cell(ANCHO_HORA, ALTO_FILA, etiqueta, border=1, align="C")
+            for valor in fila:
+                pdf.cell(ancho_col, ALTO_FILA, valor, border=1, align="C")
+            pdf.ln()
+            if negrita:
+                pdf.set_font("Arial", "", 8)
+
+    pdf.set_auto_page_break(auto_salto, pdf.b_margin)
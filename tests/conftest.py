@@ -0,0 +1,8 @@
+import os
+import sys
+from pathlib import Path
+
+# Sin archivos Parquet auxiliares ni log de diagnóstico durante las pruebas
+os.environ["INFORME_CACHE_DIR"] = ""
+os.environ["INFORME_DIAGNOSTICO_LOG"] = ""
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,70 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agregacion import CuboDespachos, horas_labels
+from ingesta import compactar
+
+
+@pytest.fixture
+def despachos():
+    rng = np.random.default_rng(0)
+    n = 2000
+    return compactar(pd.DataFrame({
+        'fecha': pd.to_datetime("2025-03-01") + pd.to_timedelta(rng.integers(0, 3, n), unit="D"),
+        'destino': rng.choice(["Calama", "Tocopilla", "Mejillones", "Taltal"], n),
+        'empresa': rng.choice(["M&Q SPA", "M S & D SPA", "COSEDUCAM S A"], n),
+        'hora': rng.integers(0, 24, n)
+    }))
+
+
+def _pivot(df, fecha, empresa):
+    """Tabla hora × destino calculada directamente con pandas, como referencia."""
+    sub = df[(df['fecha'].dt.date == fecha) & (df['empresa'] == empresa)].copy()
+    sub['destino'] = sub['destino'].astype(str)
+    tabla = sub.pivot_table(index='hora', columns='destino', values='empresa', aggfunc='size', fill_value=0)
+    tabla = tabla.reindex(range(24), fill_value=0)
+    tabla.index = horas_labels
+    return tabla
+
+
+@pytest.mark.parametrize("dia", [0, 1, 2])
+def test_tabla_coincide_con_pivot_de_pandas(despachos, dia):
+    cubo = CuboDespachos.desde_dataframe(despachos)
+    fecha = date(2025, 3, 1 + dia)
+    corte = cubo.corte(fecha)
+    for empresa in corte.empresas_presentes():
+        tabla = corte.tabla(empresa)
+        esperado = _pivot(despachos, fecha, empresa)
+        assert tabla.index[-1] == "TOTAL"
+        cuerpo = tabla.iloc[:-1]
+        assert list(cuerpo.columns) == list(esperado.columns)
+        np.testing.assert_array_equal(cuerpo.to_numpy(), esperado.to_numpy())
+        np.testing.assert_array_equal(tabla.loc["TOTAL"].to_numpy(), esperado.sum(axis=0).to_numpy())
+
+
+def test_filtros_no_dependen_del_orden_de_la_seleccion(despachos):
+    corte = CuboDespachos.desde_dataframe(despachos).corte(date(2025, 3, 1))
+    a = corte.filtrar(["Taltal", "Calama"], ["M&Q SPA", "COSEDUCAM S A"])
+    b = corte.filtrar(["Calama", "Taltal"], ["COSEDUCAM S A", "M&Q SPA"])
+    assert a.destinos == b.destinos == ["Calama", "Taltal"]
+    np.testing.assert_array_equal(a.conteos, b.conteos)
+
+
+def test_filtrar_horas_y_resumen(despachos):
+    corte = CuboDespachos.desde_dataframe(despachos).corte(date(2025, 3, 2)).filtrar_horas(8, 10)
+    empresa = corte.empresas_presentes()[0]
+    resumen = corte.resumen(empresa)
+    assert set(resumen['hora']) <= {8, 9, 10}
+
+    sub = despachos[(despachos['fecha'].dt.date == date(2025, 3, 2)) & (despachos['empresa'] == empresa)
+                    & despachos['hora'].between(8, 10)]
+    assert resumen['Cantidad'].sum() == len(sub)
+
+
+def test_cubo_compartido_es_de_solo_lectura(despachos):
+    cubo = CuboDespachos.desde_dataframe(despachos)
+    with pytest.raises(ValueError):
+        cubo.conteos[0, 0, 0, 0] = 1
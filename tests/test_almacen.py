@@ -0,0 +1,82 @@
+import sqlite3
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from almacen import AlmacenDespachos, EsquemaIncompatible
+
+
+def _despachos(horas, destino="Calama", empresa="M&Q SPA"):
+    """Despachos del 1 de marzo a las horas "HH:MM" indicadas."""
+    minutos = [int(h[:2]) * 60 + int(h[3:]) for h in horas]
+    return pd.DataFrame({
+        'fecha': pd.to_datetime(["2025-03-01"] * len(horas)),
+        'destino': [destino] * len(horas),
+        'empresa': [empresa] * len(horas),
+        'hora': [m // 60 for m in minutos],
+        'minuto': [m % 60 for m in minutos]
+    })
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    return AlmacenDespachos(str(tmp_path / "h.sqlite"))
+
+
+def test_despachos_de_la_misma_hora_en_distintos_archivos_se_conservan(almacen):
+    assert almacen.ingresar("hash-a", _despachos(["08:05"])) == 1
+    assert almacen.ingresar("hash-b", _despachos(["08:50", "09:10"])) == 2
+    assert len(almacen.consultar(date(2025, 3, 1))) == 3
+
+
+def test_libro_que_repite_dias_cargados_solo_agrega_lo_nuevo(almacen):
+    assert almacen.ingresar("diario", _despachos(["08:05", "08:05", "09:10"])) == 3
+    # El semanal trae los mismos despachos del día más uno nuevo
+    assert almacen.ingresar("semanal", _despachos(["08:05", "08:05", "09:10", "10:00"])) == 1
+    df = almacen.consultar(date(2025, 3, 1))
+    assert sorted(zip(df['hora'], df['minuto'])) == [(8, 5), (8, 5), (9, 10), (10, 0)]
+
+
+def test_reingresar_un_archivo_no_duplica(tmp_path):
+    ruta = str(tmp_path / "h.sqlite")
+    almacen = AlmacenDespachos(ruta)
+    assert almacen.ingresar("hash-a", _despachos(["08:05"] * 3)) == 3
+    assert almacen.ingresar("hash-a", _despachos(["08:05"] * 3)) == 0
+    # Otra instancia (otro proceso) tampoco lo vuelve a ingresar
+    assert AlmacenDespachos(ruta).ingresar("hash-a", _despachos(["08:05"] * 3)) == 0
+    assert len(almacen.consultar(date(2025, 3, 1))) == 3
+
+
+def test_version_cambia_al_ingresar(almacen):
+    antes = almacen.version()
+    almacen.ingresar("hash-a", _despachos(["08:05"]))
+    assert almacen.version() != antes
+    assert almacen.fechas() == [date(2025, 3, 1)]
+
+
+def test_esquema_distinto_no_se_abre_ni_se_borra(tmp_path):
+    ruta = str(tmp_path / "h.sqlite")
+    with sqlite3.connect(ruta) as con:
+        con.execute("CREATE TABLE despachos (fecha TEXT)")
+        con.execute("INSERT INTO despachos VALUES ('2025-03-01')")
+        con.execute("PRAGMA user_version = 1")
+    con.close()
+
+    with pytest.raises(EsquemaIncompatible):
+        AlmacenDespachos(ruta)
+    with sqlite3.connect(ruta) as con:
+        assert con.execute("SELECT COUNT(*) FROM despachos").fetchone() == (1,)
+    con.close()
+
+
+def test_no_pide_las_filas_de_un_archivo_ya_ingresado(almacen):
+    pedidas = []
+
+    def filas():
+        pedidas.append(1)
+        return _despachos(["08:05"])
+
+    assert almacen.ingresar("hash-a", filas) == 1
+    assert almacen.ingresar("hash-a", filas) == 0
+    assert len(pedidas) == 1
@@ -0,0 +1,100 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+from cache import CacheLRU
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    """Reloj manual para cache.time.monotonic: se avanza con reloj.ahora += segundos."""
+    reloj = SimpleNamespace(ahora=1000.0)
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: reloj.ahora))
+    return reloj
+
+
+def test_expulsa_la_menos_usada_al_superar_las_entradas():
+    c = CacheLRU(max_entradas=2)
+    c.put('a', 1)
+    c.put('b', 2)
+    c.get('a')
+    c.put('c', 3)
+    assert 'a' in c and 'c' in c and 'b' not in c
+
+
+def test_presupuesto_de_bytes():
+    c = CacheLRU(max_entradas=10, max_bytes=100)
+    c.put('a', 'A', 60)
+    c.put('b', 'B', 30)
+    c.put('c', 'C', 30)
+    assert 'a' not in c
+    assert c.bytes_usados == 60
+    # Reemplazar una entrada descuenta su tamaño anterior
+    c.put('b', 'B2', 10)
+    assert c.bytes_usados == 40
+
+
+def test_una_entrada_mayor_al_presupuesto_se_conserva_sola():
+    c = CacheLRU(max_entradas=10, max_bytes=100)
+    c.put('a', 'A', 10)
+    c.put('grande', 'G', 500)
+    assert len(c) == 1 and 'grande' in c
+
+
+def test_ttl_vence_aunque_se_siga_usando(reloj):
+    c = CacheLRU(ttl=60)
+    c.put('a', 1, 10)
+    reloj.ahora += 59
+    assert c.get('a') == 1
+    reloj.ahora += 2
+    assert c.get('a') is None
+    assert c.bytes_usados == 0
+
+
+def test_put_descarta_las_vencidas(reloj):
+    c = CacheLRU(ttl=60)
+    c.put('a', 1, 10)
+    reloj.ahora += 61
+    c.put('b', 2, 5)
+    assert len(c) == 1 and c.bytes_usados == 5
+
+
+def test_obtener_calcula_una_sola_vez_entre_hilos():
+    c = CacheLRU()
+    llamadas = []
+    barrera = threading.Barrier(8)
+
+    def calcular():
+        llamadas.append(1)
+        time.sleep(0.05)
+        return 'valor'
+
+    resultados = []
+
+    def pedir():
+        barrera.wait()
+        resultados.append(c.obtener('clave', calcular, len))
+
+    hilos = [threading.Thread(target=pedir) for _ in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert len(llamadas) == 1
+    assert resultados == ['valor'] * 8
+    assert c.bytes_usados == len('valor')
+
+
+def test_obtener_no_guarda_si_el_calculo_falla():
+    c = CacheLRU()
+
+    def falla():
+        raise RuntimeError("sin datos")
+
+    with pytest.raises(RuntimeError):
+        c.obtener('clave', falla)
+    assert 'clave' not in c
+    assert c.obtener('clave', lambda: 'ok') == 'ok'
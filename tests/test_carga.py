@@ -0,0 +1,58 @@
+from datetime import datetime, time
+
+import pytest
+
+from cache import cache_datos
+from ingesta import cargar_excels, hash_contenido, identificar_libros
+from utilidades import crear_libro, encabezado_posicional, fila_posicional
+
+
+@pytest.fixture(autouse=True)
+def cache_limpia():
+    cache_datos.clear()
+    yield
+    cache_datos.clear()
+
+
+def _libro(*hojas):
+    """Libro con una hoja por lista de horas "HH:MM" (todas de M&Q SPA a Calama)."""
+    return crear_libro({
+        f"Hoja{i}": [encabezado_posicional()] + [
+            fila_posicional(datetime(2025, 3, 1), "Calama", "M&Q SPA", hora) for hora in horas
+        ]
+        for i, horas in enumerate(hojas, start=1)
+    })
+
+
+def _libros(*archivos):
+    return identificar_libros((nombre, hash_contenido(datos), datos) for nombre, datos in archivos)
+
+
+def test_cada_fila_indica_su_archivo_y_hoja():
+    libros = _libros(("a.xlsx", _libro(["08:05"], ["09:10", "10:00"])), ("b.xlsx", _libro(["11:30"])))
+    df = cargar_excels(libros)
+    origen = sorted(zip(df['archivo'], df['hoja'], df['hora'], df['minuto']))
+    assert origen == [
+        ("a.xlsx", "Hoja1", 8, 5), ("a.xlsx", "Hoja2", 9, 10), ("a.xlsx", "Hoja2", 10, 0), ("b.xlsx", "Hoja1", 11, 30)
+    ]
+
+
+def test_libros_distintos_con_el_mismo_nombre_se_conservan():
+    a, b = _libro(["08:05"]), _libro(["09:10"])
+    libros = _libros(("semana.xlsx", a), ("semana.xlsx", b), ("semana.xlsx", a))
+    assert [nombre for nombre, _ in libros] == ["semana.xlsx", "semana.xlsx (2)"]
+
+    df = cargar_excels(libros)
+    assert sorted(zip(df['archivo'], df['hora'])) == [("semana.xlsx", 8), ("semana.xlsx (2)", 9)]
+
+
+def test_el_conjunto_combinado_ocupa_una_sola_entrada_de_cache():
+    libros = _libros(("a.xlsx", _libro(["08:05"])), ("b.xlsx", _libro(["09:10"])))
+    primero = cargar_excels(libros)
+    assert cargar_excels(libros) is primero
+    assert len(cache_datos) == 1
+
+
+def test_sin_libros_devuelve_el_esquema_vacio():
+    df = cargar_excels({})
+    assert df.empty and {'archivo', 'hoja', 'hora', 'minuto'} <= set(df.columns)
@@ -0,0 +1,29 @@
+import json
+
+import diagnostico
+from diagnostico import Diagnostico
+
+
+def test_sin_ruta_no_se_escribe_log(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    diag = Diagnostico(ruta_log="")
+    with diag.etapa("lectura", filas=3):
+        pass
+    assert diag.como_dataframe()['filas'].tolist() == [3]
+    assert not list(tmp_path.iterdir())
+
+
+def test_el_log_agrega_una_linea_por_etapa_y_rota(tmp_path, monkeypatch):
+    monkeypatch.setattr(diagnostico, "MAX_MB_LOG", 300 / 2**20)
+    ruta = tmp_path / "diagnostico.jsonl"
+    diag = Diagnostico(ruta_log=str(ruta))
+    for i in range(10):
+        with diag.etapa("pdf_empresa", filas=i):
+            pass
+
+    for manejador in diagnostico._logger_etapas(str(ruta)).handlers:
+        manejador.flush()
+    archivos = sorted(p.name for p in tmp_path.iterdir())
+    assert archivos[0] == "diagnostico.jsonl" and "diagnostico.jsonl.1" in archivos and len(archivos) <= 4
+    lineas = [json.loads(l) for l in ruta.read_text(encoding='utf-8').splitlines()]
+    assert lineas and all(l['ejecucion'] == diag.ejecucion and l['etapa'] == "pdf_empresa" for l in lineas)
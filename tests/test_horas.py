@@ -0,0 +1,45 @@
+from datetime import datetime, time
+
+import pandas as pd
+import pytest
+
+from ingesta import parsear_horas, parsear_minutos
+
+
+def _minutos(valor):
+    return parsear_minutos(pd.Series([valor], dtype=object)).tolist()
+
+
+@pytest.mark.parametrize("valor, hora", [
+    (8, 8), ('8', 8), (14, 14), ('14', 14), (8.0, 8), (0, 0), (23, 23),
+    (0.5, 12), (0.25, 6), (45717.75, 18),
+    ("08:30", 8), ("8:05", 8), ("17:45:00", 17),
+    (time(9, 5), 9), (datetime(2025, 3, 1, 17, 3), 17),
+])
+def test_parsear_horas_interpreta_formatos(valor, hora):
+    assert parsear_horas(pd.Series([valor], dtype=object)).tolist() == [hora]
+
+
+@pytest.mark.parametrize("valor", [24, 45717, -3, "x", None, "25:00", "08:75"])
+def test_parsear_horas_descarta_valores_sin_hora(valor):
+    assert parsear_horas(pd.Series([valor], dtype=object)).isna().all()
+
+
+@pytest.mark.parametrize("valor, minuto", [
+    (8.5, 8 * 60 + 30), ('8.5', 8 * 60 + 30), (13.25, 13 * 60 + 15), (23.75, 23 * 60 + 45), (1.5, 90),
+])
+def test_hora_decimal_se_lee_como_horas_y_minutos(valor, minuto):
+    assert _minutos(valor) == [minuto]
+
+
+@pytest.mark.parametrize("valor, minuto", [
+    ("2:30 PM", 14 * 60 + 30), ("2:30pm", 14 * 60 + 30), ("2:30 p.m.", 14 * 60 + 30),
+    ("9:15 AM", 9 * 60 + 15), ("12:10 AM", 10), ("12:10 PM", 12 * 60 + 10), ("11:59:59 PM", 23 * 60 + 59),
+])
+def test_texto_con_am_pm(valor, minuto):
+    assert _minutos(valor) == [minuto]
+
+
+@pytest.mark.parametrize("valor", ["13:00 PM", "0:30 AM"])
+def test_am_pm_con_hora_fuera_de_1_a_12_se_descarta(valor):
+    assert pd.isna(_minutos(valor)[0])
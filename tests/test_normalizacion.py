@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from normalizacion import normalizar_nombre_empresa, normalizar_serie
+
+
+@pytest.mark.parametrize("variante, canonico", [
+    ("m & q spa", "M&Q SPA"),
+    ("MINING AND QUARRYING SPA", "M&Q SPA"),
+    ("m.s.d. spa", "M S & D SPA"),
+    ("MS&D SPA", "M S & D SPA"),
+    ("Jorquera Transporte S.A.", "JORQUERA TRANSPORTE S. A."),
+    ("AG  Services  SpA", "AG SERVICES SPA"),
+    ("Coseducam S.A.", "COSEDUCAM S A"),
+])
+def test_variantes_registradas(variante, canonico):
+    assert normalizar_nombre_empresa(variante) == canonico
+
+
+@pytest.mark.parametrize("nombre", ["M AND S SPA", "AB SERVICES SPA", "M S AND Q SPA"])
+def test_siglas_distintas_no_se_fusionan_ni_con_aproximacion(nombre):
+    assert normalizar_nombre_empresa(nombre, aproximado=True) == nombre
+
+
+def test_aproximacion_es_opcional():
+    assert normalizar_nombre_empresa("JORQUERA TRANSPORTES SA") == "JORQUERA TRANSPORTES SA"
+    assert normalizar_nombre_empresa("JORQUERA TRANSPORTES SA", aproximado=True) == "JORQUERA TRANSPORTE S. A."
+
+
+def test_normalizar_serie_remapea_codigos():
+    serie = pd.Series(["m & q spa", None, "MS&D SPA", "M&Q SPA", "Otra Empresa"], index=[10, 11, 12, 13, 14])
+    resultado = normalizar_serie(serie)
+    assert isinstance(resultado.dtype, pd.CategoricalDtype)
+    assert resultado.index.tolist() == [10, 11, 12, 13, 14]
+    assert resultado.tolist()[0] == "M&Q SPA"
+    assert pd.isna(resultado.tolist()[1])
+    assert resultado.tolist()[2:] == ["M S & D SPA", "M&Q SPA", "OTRA EMPRESA"]
+    assert sorted(resultado.cat.categories) == ["M S & D SPA", "M&Q SPA", "OTRA EMPRESA"]
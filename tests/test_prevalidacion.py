@@ -0,0 +1,99 @@
+from datetime import datetime, time
+
+import pytest
+
+from ingesta import FormatoInvalido, cargar_excels, hash_contenido, identificar_libros, leer_excel, prevalidar
+from utilidades import crear_libro, encabezado_posicional, fila_posicional
+
+
+def test_detecta_columnas_por_posicion_a_d_l_o():
+    datos = crear_libro({"Despachos": [
+        encabezado_posicional(),
+        fila_posicional(datetime(2025, 3, 1), "Calama", "M&Q SPA", time(8, 5)),
+    ]})
+    assert prevalidar(datos) == {"Despachos": (2, {'fecha': 0, 'destino': 3, 'empresa': 11, 'hora': 14})}
+
+
+def test_detecta_columnas_desplazadas_y_fila_de_titulo():
+    datos = crear_libro({"Despachos": [
+        ["Reporte de despachos marzo"],
+        ["Nro", "Empresa Transportista", "Fecha", "Hora Entrada", "Hora Salida", "Destino"],
+        [1, "M&Q SPA", datetime(2025, 3, 1), time(8, 5), time(9, 0), "Calama"],
+        [2, "COSEDUCAM S A", datetime(2025, 3, 1), time(14, 30), time(15, 0), "Tocopilla"],
+    ]})
+    fila_inicio, posiciones = prevalidar(datos)["Despachos"]
+    assert fila_inicio == 3
+    assert posiciones == {'fecha': 2, 'destino': 5, 'empresa': 1, 'hora': 3}
+
+    df = leer_excel(datos)
+    assert df['empresa'].tolist() == ["M&Q SPA", "COSEDUCAM S A"]
+    assert df['destino'].tolist() == ["Calama", "Tocopilla"]
+    assert df['hora'].tolist() == [time(8, 5), time(14, 30)]
+
+
+def test_leer_excel_guarda_empresa_y_destino_como_categoricas():
+    datos = crear_libro({"Hoja1": [encabezado_posicional()] + [
+        fila_posicional(datetime(2025, 3, 1), "Calama", "M&Q SPA", "08:05"),
+        fila_posicional(datetime(2025, 3, 1), None, "M&Q SPA", "09:10"),
+        fila_posicional(datetime(2025, 3, 1), "Calama", "COSEDUCAM S A", "10:00"),
+    ]})
+    df = leer_excel(datos)
+    assert df['empresa'].cat.categories.tolist() == ["M&Q SPA", "COSEDUCAM S A"]
+    assert df['empresa'].cat.codes.tolist() == [0, 0, 1]
+    assert df['destino'].isna().tolist() == [False, True, False]
+
+
+def test_sin_encabezado_reconocible_usa_posiciones_si_la_muestra_es_valida():
+    datos = crear_libro({"Hoja1": [
+        fila_posicional("c1", "c4", "c12", "c15"),
+        fila_posicional("01/03/2025", "Calama", "M&Q SPA", "08:05"),
+    ]})
+    assert prevalidar(datos)["Hoja1"] == (2, {'fecha': 0, 'destino': 3, 'empresa': 11, 'hora': 14})
+
+
+def test_rechaza_libro_sin_columnas_de_despachos():
+    datos = crear_libro({"Hoja1": [["a", "b", "c"], [1, 2, 3]]})
+    with pytest.raises(FormatoInvalido):
+        prevalidar(datos)
+
+
+def test_rechaza_posiciones_con_datos_basura():
+    datos = crear_libro({"Hoja1": [
+        fila_posicional("x", "y", "z", "w"),
+        fila_posicional("no es fecha", "Calama", "M&Q SPA", "tampoco hora"),
+    ]})
+    with pytest.raises(FormatoInvalido):
+        prevalidar(datos)
+
+
+def test_rechaza_archivo_que_no_es_excel():
+    with pytest.raises(FormatoInvalido):
+        prevalidar(b"esto no es un libro de Excel")
+
+
+def test_solo_se_consideran_las_hojas_validas():
+    datos = crear_libro({
+        "Resumen": [["Total", 10]],
+        "Semana1": [encabezado_posicional(), fila_posicional(datetime(2025, 3, 1), "Calama", "M&Q SPA", "08:05")],
+    })
+    assert list(prevalidar(datos)) == ["Semana1"]
+
+
+def _libros(*archivos):
+    return identificar_libros((nombre, hash_contenido(datos), datos) for nombre, datos in archivos)
+
+
+def test_un_libro_invalido_se_omite_sin_rechazar_los_demas():
+    bueno = crear_libro({"Hoja1": [
+        encabezado_posicional(), fila_posicional(datetime(2025, 3, 1), "Calama", "M&Q SPA", "08:05")
+    ]})
+    df = cargar_excels(_libros(("bueno.xlsx", bueno), ("basura.xlsx", b"no es Excel")))
+    assert df['archivo'].unique().tolist() == ["bueno.xlsx"]
+    assert list(df.attrs['rechazados']) == ["basura.xlsx"]
+
+
+def test_si_ningun_libro_sirve_el_error_nombra_cada_archivo():
+    sin_columnas = crear_libro({"Hoja1": [["a", "b"], [1, 2]]})
+    with pytest.raises(FormatoInvalido) as error:
+        cargar_excels(_libros(("x.xlsx", b"no es Excel"), ("y.xlsx", sin_columnas)))
+    assert "x.xlsx:" in str(error.value) and "y.xlsx: " in str(error.value) and "Hoja1" in str(error.value)
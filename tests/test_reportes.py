@@ -0,0 +1,72 @@
+import io
+import os
+import signal
+import zipfile
+
+import pandas as pd
+import pytest
+
+import reportes
+from agregacion import horas_labels
+from reportes import generar_zip_reportes, nombre_archivo
+
+
+def _tabla():
+    tabla = pd.DataFrame({"Calama": [1] * 24}, index=horas_labels)
+    tabla.loc["TOTAL"] = tabla.sum()
+    return tabla
+
+
+# Sin resumen no se rasteriza el gráfico: el PDF no depende de kaleido
+SIN_GRAFICO = pd.DataFrame(columns=['hora', 'destino', 'Cantidad'])
+
+
+@pytest.mark.parametrize("empresa, nombre", [
+    ("M&Q SPA", "dashboard_M&Q SPA.pdf"),
+    ("M/Q SPA", "dashboard_M Q SPA.pdf"),
+    ("../../etc/passwd", "dashboard_etc passwd.pdf"),
+    ('A:B*C?"D"<E>|F\\G', "dashboard_A B C D E F G.pdf"),
+    ("///", "dashboard_Empresa.pdf"),
+])
+def test_nombre_archivo_es_seguro(empresa, nombre):
+    assert nombre_archivo(empresa) == nombre
+
+
+def test_nombres_que_coinciden_tras_limpiar_no_se_pisan():
+    usados = set()
+    assert [nombre_archivo(e, usados) for e in ["M/Q", "M?Q", "m q"]] == [
+        "dashboard_M Q.pdf", "dashboard_M Q (2).pdf", "dashboard_m q (3).pdf"
+    ]
+
+
+def test_un_pdf_fallido_no_detiene_el_zip():
+    datos = generar_zip_reportes({
+        "M/Q SPA": (SIN_GRAFICO, _tabla()),
+        "ROTA SPA": (SIN_GRAFICO, None),
+    })
+    with zipfile.ZipFile(io.BytesIO(datos)) as zf:
+        assert sorted(zf.namelist()) == ["dashboard_M Q SPA.pdf", "errores.txt"]
+        assert zf.read("dashboard_M Q SPA.pdf").startswith(b"%PDF")
+        assert zf.read("errores.txt").decode().startswith("ROTA SPA: ")
+
+
+def test_si_fallan_todos_los_pdf_se_informa_el_error():
+    with pytest.raises(RuntimeError, match="ningún PDF"):
+        generar_zip_reportes({"ROTA SPA": (SIN_GRAFICO, None)})
+
+
+def test_el_pool_de_pdf_se_reutiliza_entre_llamadas():
+    generar_zip_reportes({"A": (SIN_GRAFICO, _tabla())})
+    pool = reportes._pool
+    generar_zip_reportes({"B": (SIN_GRAFICO, _tabla())})
+    assert reportes._pool is pool
+
+
+def test_un_proceso_muerto_no_deja_el_pool_roto():
+    generar_zip_reportes({"A": (SIN_GRAFICO, _tabla())})
+    for proceso in list(reportes._pool._processes.values()):
+        os.kill(proceso.pid, signal.SIGKILL)
+        proceso.join()
+    datos = generar_zip_reportes({"B": (SIN_GRAFICO, _tabla()), "C": (SIN_GRAFICO, _tabla())})
+    with zipfile.ZipFile(io.BytesIO(datos)) as zf:
+        assert sorted(zf.namelist()) == ["dashboard_B.pdf", "dashboard_C.pdf"]
@@ -0,0 +1,54 @@
+import logging
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import ingesta
+from ingesta import _leer_libros, hash_contenido
+from utilidades import crear_libro, encabezado_posicional, fila_posicional
+
+
+@pytest.fixture
+def libro():
+    datos = crear_libro({"Hoja1": [encabezado_posicional()] + [
+        fila_posicional(datetime(2025, 3, 1), "Calama", "M&Q SPA", "08:05"),
+        fila_posicional(datetime(2025, 3, 1), "Antofagasta", "Transportes Norte", "09:40"),
+    ]})
+    return {hash_contenido(datos): datos}
+
+
+@pytest.fixture
+def sidecar(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingesta, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ingesta, "_aviso_sidecar", False)
+    return tmp_path
+
+
+def test_el_parquet_auxiliar_devuelve_el_mismo_dataframe(libro, sidecar, monkeypatch):
+    (clave, original), = _leer_libros(libro)[0].items()
+    assert list(sidecar.glob(f"{clave}.*.parquet"))
+
+    def sin_excel(datos):
+        raise AssertionError("el libro no debería volver a leerse")
+    monkeypatch.setattr(ingesta, "prevalidar", sin_excel)
+    frames, errores = _leer_libros(libro)
+
+    assert not errores
+    pd.testing.assert_frame_equal(frames[clave], original)
+    assert frames[clave]['minuto'].tolist() == [5, 40]
+    assert frames[clave].attrs['bytes_crudos'] == original.attrs['bytes_crudos']
+
+
+def test_un_parquet_ilegible_se_avisa_una_vez_y_se_relee_el_excel(libro, sidecar, caplog):
+    clave, = libro
+    _leer_libros(libro)
+    for ruta in sidecar.glob("*.parquet"):
+        ruta.write_bytes(b"no es parquet")
+
+    with caplog.at_level(logging.WARNING, logger="ingesta"):
+        primero, _ = _leer_libros(libro)
+        segundo, _ = _leer_libros(libro)
+
+    assert len(primero[clave]) == len(segundo[clave]) == 2
+    assert len([r for r in caplog.records if "Parquet auxiliar" in r.getMessage()]) == 1
@@ -0,0 +1,42 @@
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from tabla_excel import MAX_NOMBRE_HOJA, _nombre_hoja, generar_excel_empresas
+
+
+def test_nombre_hoja_quita_caracteres_invalidos():
+    assert _nombre_hoja("M/Q [Bateas]: A*B?", set()) == "M Q  Bateas   A B"
+
+
+def test_nombre_hoja_vacio_usa_un_nombre_por_defecto():
+    assert _nombre_hoja("[]", set()) == "Empresa"
+
+
+def test_nombre_hoja_se_trunca_a_31_caracteres():
+    nombre = _nombre_hoja("TRANSPORTES Y SERVICIOS DEL NORTE LIMITADA", set())
+    assert nombre == "TRANSPORTES Y SERVICIOS DEL NOR"
+    assert len(nombre) == MAX_NOMBRE_HOJA
+
+
+@pytest.mark.parametrize("empresas", [
+    ["M&Q SPA", "m&q spa", "M&Q SPA"],
+    ["TRANSPORTES Y SERVICIOS DEL NORTE LIMITADA", "TRANSPORTES Y SERVICIOS DEL NORTE SPA"],
+    ["Resumen", "RESUMEN"],
+])
+def test_nombres_de_hoja_no_se_repiten(empresas):
+    usados = {"resumen"}
+    nombres = [_nombre_hoja(e, usados) for e in empresas]
+    assert len({n.lower() for n in nombres} | {"resumen"}) == len(nombres) + 1
+    assert all(len(n) <= MAX_NOMBRE_HOJA for n in nombres)
+
+
+def test_libro_tiene_resumen_y_una_hoja_por_empresa():
+    tabla = pd.DataFrame({"Calama": [2, 1], "Taltal": [0, 3]}, index=["08:00 - 09:00", "09:00 - 10:00"])
+    tabla.loc["TOTAL"] = tabla.sum()
+    datos = generar_excel_empresas({"M/Q SPA": tabla, "M?Q SPA": tabla}, titulo="Equipos")
+    wb = openpyxl.load_workbook(io.BytesIO(datos))
+    assert wb.sheetnames == ["Resumen", "M Q SPA", "M Q SPA (2)"]
+    assert [c.value for c in wb["M Q SPA"][4]] == ["TOTAL", 3, 3]
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fpdf import FPDF
+
+import tabla_pdf
+from agregacion import horas_labels
+from tabla_pdf import ANCHO_HORA, ANCHO_MIN_COLUMNA, _grupos_columnas, escribir_tabla
+
+
+@pytest.mark.parametrize("n_columnas", [0, 1, 5, 11, 12, 23, 40])
+def test_grupos_cubren_todas_las_columnas_y_caben(n_columnas):
+    ancho_util = 190
+    grupos = _grupos_columnas(n_columnas, ancho_util)
+    assert np.concatenate(grupos).tolist() == list(range(n_columnas))
+    tamanos = [len(g) for g in grupos]
+    assert max(tamanos) - min(tamanos) <= 1
+    assert all(ANCHO_HORA + t * ANCHO_MIN_COLUMNA <= ancho_util for t in tamanos)
+
+
+def _tabla(n_destinos):
+    conteos = np.arange(24 * n_destinos).reshape(24, n_destinos) % 7
+    tabla = pd.DataFrame(conteos, index=horas_labels, columns=[f"Destino {i}" for i in range(n_destinos)])
+    tabla.loc["TOTAL"] = tabla.sum()
+    return tabla
+
+
+@pytest.fixture
+def encabezados(monkeypatch):
+    """Registra la página en que se escribe cada encabezado de la tabla."""
+    paginas = []
+    original = tabla_pdf._escribir_encabezado
+
+    def espia(pdf, columnas, ancho_col):
+        paginas.append((pdf.page, len(columnas)))
+        original(pdf, columnas, ancho_col)
+
+    monkeypatch.setattr(tabla_pdf, "_escribir_encabezado", espia)
+    return paginas
+
+
+def _pdf():
+    pdf = FPDF(orientation='P', unit='mm', format='A4')
+    pdf.add_page()
+    return pdf
+
+
+def test_el_encabezado_se_repite_en_cada_salto_de_pagina(encabezados):
+    pdf = _pdf()
+    pdf.set_y(200)
+    escribir_tabla(pdf, _tabla(4))
+    assert pdf.page == 2
+    assert encabezados == [(1, 4), (2, 4)]
+
+
+def test_cada_grupo_de_columnas_empieza_en_su_pagina(encabezados):
+    pdf = _pdf()
+    escribir_tabla(pdf, _tabla(30))
+    grupos = _grupos_columnas(30, pdf.w - pdf.l_margin - pdf.r_margin)
+    assert len(grupos) > 1
+    assert [n for _, n in encabezados] == [len(g) for g in grupos]
+    assert [p for p, _ in encabezados] == list(range(1, len(grupos) + 1))
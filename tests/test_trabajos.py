@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from trabajos import ERROR, LISTO, ColaTrabajos
+
+
+@pytest.fixture
+def cola():
+    return ColaTrabajos(max_hilos=2)
+
+
+def _esperar(trabajo, segundos=5):
+    for _ in range(int(segundos / 0.01)):
+        if trabajo.terminado:
+            return trabajo
+        threading.Event().wait(0.01)
+    raise AssertionError(f"El trabajo {trabajo.nombre} no terminó")
+
+
+def test_la_misma_clave_devuelve_el_mismo_trabajo(cola):
+    liberar = threading.Event()
+    llamadas = []
+
+    def generar(avance):
+        llamadas.append(1)
+        liberar.wait(5)
+        return b"pdf"
+
+    primero = cola.encolar('k', "PDF", "a.pdf", "application/pdf", generar)
+    assert cola.encolar('k', "PDF", "a.pdf", "application/pdf", generar) is primero
+    liberar.set()
+    _esperar(primero)
+    # Ya listo, se sigue entregando el resultado guardado
+    assert cola.encolar('k', "PDF", "a.pdf", "application/pdf", generar) is primero
+    assert cola.obtener('k') is primero
+    assert primero.estado == LISTO and primero.resultado == b"pdf"
+    assert len(llamadas) == 1
+
+
+def test_un_trabajo_con_error_se_reintenta(cola):
+    intentos = []
+
+    def generar(avance):
+        intentos.append(1)
+        if len(intentos) == 1:
+            raise RuntimeError("falta kaleido")
+        return b"ok"
+
+    fallido = _esperar(cola.encolar('k', "PDF", "a.pdf", "application/pdf", generar))
+    assert fallido.estado == ERROR and fallido.error == "falta kaleido"
+
+    reintento = _esperar(cola.encolar('k', "PDF", "a.pdf", "application/pdf", generar))
+    assert reintento is not fallido
+    assert reintento.estado == LISTO and reintento.resultado == b"ok"
+    assert len(intentos) == 2
+
+
+def test_avance_se_acota_entre_0_y_1(cola):
+    vistos = []
+
+    def generar(avance):
+        for fraccion in (-1, 0.5, 3):
+            avance(fraccion)
+            vistos.append(trabajo.avance)
+        return b""
+
+    liberar = threading.Event()
+    trabajo = cola.encolar('k', "ZIP", "a.zip", "application/zip", lambda avance: liberar.wait(5) and generar(avance))
+    liberar.set()
+    _esperar(trabajo)
+    assert vistos == [0.0, 0.5, 1.0]
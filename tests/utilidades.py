@@ -0,0 +1,27 @@
+import io
+
+import openpyxl
+
+
+def crear_libro(hojas):
+    """Arma un .xlsx en memoria a partir de {hoja: [filas]} y devuelve sus bytes."""
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for nombre, filas in hojas.items():
+        ws = wb.create_sheet(nombre)
+        for fila in filas:
+            ws.append(list(fila))
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def fila_posicional(fecha, destino, empresa, hora, ancho=16):
+    """Fila con los datos en las columnas A/D/L/O."""
+    fila = [None] * ancho
+    fila[0], fila[3], fila[11], fila[14] = fecha, destino, empresa, hora
+    return fila
+
+
+def encabezado_posicional():
+    return fila_posicional("Fecha", "Destino", "Empresa", "Hora Entrada")
@@ -0,0 +1,93 @@
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import CacheLRU
+
+EN_COLA = "en cola"
+EN_CURSO = "en curso"
+LISTO = "listo"
+ERROR = "error"
+
+_ids = itertools.count(1)
+
+
+class Trabajo:
+    """Un reporte encargado a la cola: estado, avance (0-1) y, al terminar, sus bytes."""
+
+    def __init__(self, clave, nombre, archivo, mime):
+        self.id = next(_ids)
+        self.clave = clave
+        self.nombre = nombre
+        self.archivo = archivo
+        self.mime = mime
+        self.estado = EN_COLA
+        self.avance = 0.0
+        self.resultado = None
+        self.error = None
+        self.segundos = None
+
+    @property
+    def terminado(self):
+        return self.estado in (LISTO, ERROR)
+
+
+class ColaTrabajos:
+    """Ejecuta reportes en hilos de fondo para que el script de Streamlit no quede bloqueado.
+
+    Los trabajos se identifican por `clave`: pedir de nuevo un reporte en cola, en curso o
+    ya listo devuelve el mismo trabajo. Los terminados se guardan en una cache acotada por
+    cantidad y bytes, así la descarga sigue disponible entre re-ejecuciones.
+    """
+
+    def __init__(self, max_hilos=2, max_resultados=32, max_bytes=256 * 2**20):
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="reportes")
+        self._lock = threading.Lock()
+        self._pendientes = {}
+        self._resultados = CacheLRU(max_entradas=max_resultados, max_bytes=max_bytes)
+
+    def encolar(self, clave, nombre, archivo, mime, funcion):
+        """Encola `funcion(avance)`, que debe devolver los bytes del reporte.
+
+        `avance(fraccion)` permite informar el progreso mientras se genera.
+        """
+        with self._lock:
+            trabajo = self._pendientes.get(clave) or self._resultados.get(clave)
+            if trabajo is not None and trabajo.estado != ERROR:
+                return trabajo
+            trabajo = Trabajo(clave, nombre, archivo, mime)
+            self._pendientes[clave] = trabajo
+        self._pool.submit(self._ejecutar, trabajo, funcion)
+        return trabajo
+
+    def _ejecutar(self, trabajo, funcion):
+        trabajo.estado = EN_CURSO
+        inicio = time.perf_counter()
+
+        def avance(fraccion):
+            trabajo.avance = min(max(float(fraccion), 0.0), 1.0)
+
+        try:
+            trabajo.resultado = funcion(avance)
+            trabajo.avance = 1.0
+            trabajo.estado = LISTO
+        except Exception as e:
+            trabajo.error = str(e)
+            trabajo.estado = ERROR
+        trabajo.segundos = time.perf_counter() - inicio
+        with self._lock:
+            self._pendientes.pop(trabajo.clave, None)
+            self._resultados.put(trabajo.clave, trabajo, len(trabajo.resultado or b""))
+
+    def obtener(self, clave):
+        with self._lock:
+            return self._pendientes.get(clave) or self._resultados.get(clave)
+
+
+# Cola compartida por todas las sesiones del proceso
+cola_reportes = ColaTrabajos(
+    max_hilos=int(os.environ.get("INFORME_TRABAJOS_HILOS", 2)),
+    max_bytes=int(float(os.environ.get("INFORME_TRABAJOS_MB", 256)) * 2**20)
+)